@@ -0,0 +1,60 @@
+"""
+Micro-benchmark del mapeo de códigos de puerto a descripciones.
+
+Compara el `.apply` por fila que usaba `load_data` con `database.lookups.describe`,
+que factoriza la columna y solo mapea los códigos distintos.
+
+Uso: python benchmarks/bench_port_mapping.py [filas]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.lookups import describe  # noqa: E402
+
+
+def build_data(rows, n_ports=400, seed=0):
+    rng = np.random.default_rng(seed)
+    codes = np.array([f"P{i:04d}" for i in range(n_ports)], dtype=object)
+    # Un 10% de los códigos no tiene descripción (se conserva el código)
+    ports_map = {code: f"Puerto {code}" for code in codes[: int(n_ports * 0.9)]}
+    column = codes[rng.integers(0, n_ports, rows)]
+    # Un 5% de nulos
+    column[rng.random(rows) < 0.05] = None
+    return pd.Series(column, name='loading_port'), {'ports': ports_map}
+
+
+def apply_per_row(series, ports_map):
+    def map_loading_port(code):
+        if code is None or pd.isna(code):
+            return ''
+        return ports_map.get(str(code), code)
+
+    return series.apply(map_loading_port)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    series, maps = build_data(rows)
+
+    expected, t_apply = timed(apply_per_row, series, maps['ports'])
+    result, t_factorize = timed(describe, series, 'ports', maps)
+    assert expected.tolist() == result.tolist(), "Los resultados no coinciden"
+
+    print(f"Filas: {rows:,}  códigos distintos: {series.nunique():,}")
+    print(f".apply por fila:      {t_apply:8.3f} s")
+    print(f"factorize + mapeo:    {t_factorize:8.3f} s")
+    print(f"Aceleración:          {t_apply / t_factorize:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,26 @@
 import os
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 import mysql.connector
 from datetime import datetime, time
+from time import perf_counter
 from dotenv import load_dotenv
+from database import clear_query_cache, get_connection, pool_stats, query_cache_stats
+from database.aggregates import compute_aggregates, fetch_aggregates
+from database.lookup_cache import lookup_cache
+from database.movimientos import (
+    FULL_RELOAD_INTERVAL, LAZY_COLUMNS, LOAD_TTL, fetch_movimientos_page, load_movimientos, movimientos_store, sortable_columns,
+    with_lazy_columns,
+)
+from database.query_builder import DATE_FILTERS, build_where, fetch_filter_options, table_version
+from utils.charts import cached_figure, figure_cache_stats
+from utils.memory import is_categorical
+from utils.pagination import PAGE_SIZES, page_count, slice_page
 
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
 
+script_start = perf_counter()
+
 # --- Configuración de la Página ---
 st.set_page_config(
     page_title="INFOPORT | Movimiento de Contenedores",
@@ -17,163 +29,148 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- Configuración de la Base de Datos ---
-# **IMPORTANTE:** Reemplaza estos valores con tus credenciales de CloudPanel
-DB_CONFIG = {
-    'user': os.getenv("DB_USER"),
-    'password': os.getenv("DB_PASSWD"),
-    'host': os.getenv("DB_HOST"), # Podría ser '127.0.0.1' o el host de tu base de datos
-    'database': os.getenv("DB_NAME")
-}
+# Modo de consulta: 'memory' carga la tabla completa y filtra en pandas;
+# 'sql' envía los filtros del sidebar a MySQL y solo trae las filas seleccionadas
+QUERY_MODE = os.getenv("QUERY_MODE", "memory")
+# Filas por página de la tabla (0 envía todas las filas filtradas al navegador)
+TABLE_PAGE_SIZE = int(os.getenv("TABLE_PAGE_SIZE", "100"))
+# Aplicación de filtros por defecto: 'form' los agrupa y se aplican con un botón;
+# 'auto' aplica cada cambio al momento (cada cambio recalcula todo el dashboard)
+FILTER_APPLY = os.getenv("FILTER_APPLY", "form")
+
+# Campos disponibles para filtrar
+filter_cols = ['operator', 'loading_port_', 'discharge_port', 'arrival_date', 'departure_date', 'status_', 'full_/_empty_', 'port_register_']
+
+def show_db_error(e):
+    st.error(f"Error al conectar o cargar datos de la base de datos: {e}")
+    st.info("Por favor, asegúrate de que MariaDB/MySQL esté corriendo y las credenciales del archivo `.env` sean correctas.")
 
-@st.cache_data(ttl=600)
 def load_data():
     """
     Carga los datos de la tabla movimiento_contenedores y sus lookups.
-    Usa st.cache_data para que la conexión y la carga se hagan solo una vez.
+    Los datos se mantienen en memoria en `movimientos_store`, que solo trae de la
+    base de datos las filas nuevas cuando vence el TTL (ver database/movimientos.py),
+    usando el pool de conexiones compartido del paquete `database`.
+    Devuelve un MovimientosData (frame + índice de filtros) o None en caso de error.
     """
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        
-        # 1. Movimientos de Contenedores
-        query_movimientos = """
-        SELECT 
-            id, operator, trip_number, ship_name, loading_port, discharge_port, delivery_port, dock, 
-            arrival_date, arrival_time, departure_date, departure_time, container_number, 
-            size, type, status, full_empty, temperature, description, dgn_code, imo, 
-            call_sign, visit_no, eqd_qual, port_register
-        FROM movimiento_contenedores ORDER BY -id;
-        """
-        df_movimientos = pd.read_sql(query_movimientos, conn)
-        
-        # 2. Lookups (Estatus y Contenido)
-        df_status = pd.read_sql("SELECT code, description FROM estatus_contenedor", conn)
-        df_content = pd.read_sql("SELECT code, description FROM contenido_contenedor", conn)
-        df_ports = pd.read_sql("SELECT codPaisPuerto, descripcion FROM puertosInternacionales", conn)
-        df_eqd_qual = pd.read_sql("SELECT code, description FROM calificador_de_equipo", conn)
-        
-        conn.close()
-
-        # 3. Mapeo de códigos a descripciones para el dashboard
-        status_map = df_status.set_index('code')['description'].to_dict()
-        content_map = df_content.set_index('code')['description'].to_dict()
-        ports_map = df_ports.set_index('codPaisPuerto')['descripcion'].to_dict()
-        eqd_qual_map = df_eqd_qual.set_index('code')['description'].to_dict()
-        
-        # Función de mapeo con fallback: usa la descripción si existe, si no, usa el valor original
-        def map_loading_port(code):
-            # Usa el método .get(key, default_value)
-            if code is None or pd.isna(code):
-                return ''
-            # Se asegura que la clave sea string antes de la búsqueda
-            return ports_map.get(str(code), code)
-
-        df_movimientos['status_'] = df_movimientos['status'].map(status_map).fillna('Desconocido')
-        df_movimientos['full_/_empty_'] = df_movimientos['full_empty'].map(content_map).fillna('Desconocido')
-        df_movimientos['port_register_'] = df_movimientos['port_register'].apply(map_loading_port)
-        df_movimientos['loading_port_'] = df_movimientos['loading_port'].apply(map_loading_port)
-        df_movimientos['discharge_port'] = df_movimientos['discharge_port'].apply(map_loading_port)
-        df_movimientos['delivery_port'] = df_movimientos['delivery_port'].apply(map_loading_port)
-        df_movimientos['eqd_-_qual'] = df_movimientos['eqd_qual'].map(eqd_qual_map).fillna('Desconocido')
-        
-        # Conversión de tipos de datos para filtros (especialmente fechas)
-        df_movimientos['arrival_date'] = pd.to_datetime(df_movimientos['arrival_date'], errors='coerce').dt.date
-        df_movimientos['departure_date'] = pd.to_datetime(df_movimientos['departure_date'], errors='coerce').dt.date
-        
-        return df_movimientos
-    
+        data = movimientos_store.get()
+        if data is None:
+            # La primera carga sigue en curso en segundo plano: se espera un poco y se reintenta
+            with st.spinner("Cargando los datos por primera vez..."):
+                movimientos_store.wait(2)
+            st.rerun()
+        return data
+
     except mysql.connector.Error as e:
-        st.error(f"Error al conectar o cargar datos de la base de datos: {e}")
-        st.info("Por favor, asegúrate de que MariaDB/MySQL esté corriendo y las credenciales en el script `dashboard.py` sean correctas.")
-        return pd.DataFrame() # Devuelve un DataFrame vacío en caso de error
+        show_db_error(e)
+        return None
 
-df = load_data()
-# --- Diseño del Dashboard ---
-st.title("🚢 Dashboard Interactivo: Movimiento de Contenedores")
-st.markdown("Filtra los datos usando la barra lateral izquierda y observa las métricas clave.")
+def load_lookup_maps():
+    # Caché propia con TTL largo (LOOKUP_TTL) y lectura en paralelo de las tablas
+    return lookup_cache.get()
 
-if not df.empty:
-    
-    # -----------------------------------
-    # Sidebar para Filtros Interactivos
-    # -----------------------------------
-    st.sidebar.image('assets/amp_logo_espaciado.png', width='stretch')
-    st.sidebar.header("Opciones de Filtrado")
-    
-    # Campos disponibles para filtrar
-    filter_cols = ['operator', 'loading_port_', 'discharge_port', 'arrival_date', 'departure_date', 'status_', 'full_/_empty_', 'port_register_']
-    
-    # Crear un diccionario para almacenar los valores filtrados
-    filter_values = {}
+@st.cache_data(ttl=FULL_RELOAD_INTERVAL, max_entries=4, show_spinner=False)
+def load_sql_options_for(version):
+    """
+    Modo SQL: opciones de los filtros para una versión de la tabla y de los lookups
+    (ver `load_sql_filter_options`). Los valores distintos solo se recalculan cuando
+    cambia la versión; los cambios en filas ya existentes, cada FULL_RELOAD_INTERVAL.
+    """
+    maps = load_lookup_maps()
+    with get_connection() as conn:
+        return fetch_filter_options(conn, maps)
 
-    for col in filter_cols:
-        if col in ['arrival_date', 'departure_date']:
-            # Manejo de Filtros de Fecha
-            min_date = df[col].min()
-            max_date = df[col].max()
-            
-            if pd.isna(min_date) or pd.isna(max_date):
-                st.sidebar.warning(f"No hay datos de fecha válidos para '{col}'.")
-                continue
-                
-            # --- CORRECCIÓN: Verifica si la fecha mínima y máxima son iguales ---
-            if min_date == max_date:
-                st.sidebar.info(f"Fecha Única para '{col}': {min_date}")
-                # Establecer el filtro al valor único y continuar
-                filter_values[col] = (min_date, max_date) 
-            else:
-                # Si hay un rango de fechas válido, muestra el slider
-                date_range = st.sidebar.slider(
-                    f"Selecciona rango de {col}",
-                    min_value=min_date,
-                    max_value=max_date,
-                    value=(min_date, max_date),
-                    format="YYYY-MM-DD"
-                )
-                # El filtro de fecha se aplicará después
-                filter_values[col] = date_range
-            
-        elif col in ['status_desc', 'full_empty_']:
-            # Usar la descripción mapeada para la selección
-            unique_options = sorted(df[col].unique().tolist())
-            selected = st.sidebar.multiselect(
-                f"Filtrar por {col.replace('_', '').capitalize()}",
-                options=unique_options,
-                default=unique_options
-            )
-            filter_values[col] = selected
-            
-        else:
-            # Filtros de Multiselect (Operador, Puertos, Registro)
-            unique_options = sorted(df[col].astype(str).unique().tolist())
-            selected = st.sidebar.multiselect(
-                f"Filtrar por {col.replace('_', ' ').capitalize()}",
-                options=unique_options,
-                default=unique_options
-            )
-            filter_values[col] = selected
+@st.cache_data(ttl=LOAD_TTL)
+def load_sql_filter_options():
+    """
+    Modo SQL: opciones de los filtros, total de registros y versión de los datos
+    (tabla y lookups), calculados en la base de datos.
+    """
+    load_lookup_maps()
+    with get_connection() as conn:
+        total_rows, max_id = table_version(conn)
+    version = (total_rows, max_id, lookup_cache.version)
+    return load_sql_options_for(version), total_rows, version
 
-    # -----------------------------------
-    # Lógica de Filtrado
-    # -----------------------------------
-    df_filtered = df.copy()
+@st.cache_data(ttl=LOAD_TTL)
+def load_filtered_data(filter_values, filter_options):
+    """
+    Modo SQL: trae solo las filas que cumplen los filtros, aplicados como WHERE parametrizado.
+    """
+    maps = load_lookup_maps()
+    where, params = build_where(filter_values, filter_options, maps)
+    with get_connection() as conn:
+        return load_movimientos(conn, maps, where=where, params=params)
 
-    for col, selected_values in filter_values.items():
-        if col in ['arrival_date', 'departure_date']:
-            # Aplicar filtro de rango de fechas
-            start_date, end_date = selected_values
-            # Se convierte a datetime.date para la comparación
-            df_filtered = df_filtered[
-                (df_filtered[col] >= start_date) & 
-                (df_filtered[col] <= end_date)
-            ]
-        else:
-            # Aplicar filtro de multiselect
-            df_filtered = df_filtered[df_filtered[col].astype(str).isin(selected_values)]
+@st.cache_data(ttl=LOAD_TTL)
+def load_sql_aggregates(filter_values, filter_options):
+    """
+    Modo SQL: conteos de las gráficas calculados con GROUP BY en la base de datos.
+    """
+    maps = load_lookup_maps()
+    where, params = build_where(filter_values, filter_options, maps)
+    with get_connection() as conn:
+        return fetch_aggregates(conn, maps, where, params)
 
+@st.cache_data(ttl=LOAD_TTL)
+def fetch_sql_page(filter_values, filter_options, sort, ascending, page, page_size, after_id, lazy_columns, data_version):
+    # `data_version` solo forma parte de la clave de caché: una página no se reutiliza entre versiones
+    maps = load_lookup_maps()
+    where, params = build_where(filter_values, filter_options, maps)
+    with get_connection() as conn:
+        return fetch_movimientos_page(conn, maps, where, params, sort, ascending, page, page_size, after_id, lazy_columns)
 
-    st.info(f"Mostrando {len(df_filtered)} registros de {len(df)} totales.")
+def load_sql_page(filter_values, filter_options, sort, ascending, page, page_size, lazy_columns, data_version):
+    """
+    Modo SQL: trae solo una página de la tabla. Guarda en la sesión el último id de
+    cada página vista para pedir la siguiente por keyset cuando se ordena por id.
+    Los ids guardados solo valen para la misma versión de los datos (`data_version`):
+    con filas nuevas, los límites de las páginas ya no coinciden.
+    """
+    key = (repr(filter_values), sort, ascending, page_size, data_version)
+    keyset = st.session_state.get('page_keyset')
+    if keyset is None or keyset['key'] != key:
+        keyset = st.session_state['page_keyset'] = {'key': key, 'last_ids': {}}
+    after_id = keyset['last_ids'].get(page - 1) if sort == 'id' else None
+    df_page = fetch_sql_page(
+        filter_values, filter_options, sort, ascending, page, page_size, after_id, lazy_columns, data_version,
+    )
+    if not df_page.empty:
+        keyset['last_ids'][page] = int(df_page['id'].iloc[-1])
+    return df_page
+
+def filter_state(col, full_value, options=None):
+    """
+    Valor actual del filtro `col` (estado del widget en la sesión), ajustado a las
+    opciones o al rango de fechas de la versión actual de los datos. Si el filtro
+    tenía todo seleccionado, sigue así aunque aparezcan opciones o fechas nuevas.
+    """
+    key = f"filtro_{col}"
+    value = st.session_state.get(key)
+    if value is None or value == st.session_state.get(f"{key}_completo"):
+        value = list(full_value) if options is not None else full_value
+    elif options is not None:
+        available = set(options)
+        value = [option for option in value if option in available]
+    else:
+        min_date, max_date = full_value
+        start, end = max(value[0], min_date), min(value[1], max_date)
+        value = (start, end) if start <= end else full_value
+    # Solo se reescribe si cambia, para no pisar cambios aún sin aplicar del formulario
+    if st.session_state.get(key) != value:
+        st.session_state[key] = value
+    st.session_state[f"{key}_completo"] = full_value
+    return value
 
+@st.fragment
+def render_charts(aggregates):
+    """
+    Gráficas del dashboard. Como fragmento solo se vuelven a generar en una
+    ejecución completa (cambio de filtros), no al interactuar con la tabla, y las
+    figuras se reutilizan mientras los agregados no cambien (ver utils/charts.py).
+    """
+    start = perf_counter()
     # -----------------------------------
     # Gráficas Interactivas
     # -----------------------------------
@@ -183,10 +180,10 @@ if not df.empty:
     # 1. Gráfico de Barras: Movimientos por Operador (Bar Chart)
     with col1:
         st.subheader("Movimientos por Operador")
-        if not df_filtered.empty:
-            df_count = df_filtered['operator'].value_counts().reset_index()
-            df_count.columns = ['Operador', 'Conteo']
-            fig_bar = px.bar(
+        if aggregates['total']:
+            df_count = aggregates['operator']
+            fig_bar = cached_figure(
+                'bar',
                 df_count,
                 x='Operador',
                 y='Conteo',
@@ -197,10 +194,10 @@ if not df.empty:
     # 2. Gráfico de Pastel: Distribución Lleno/Vacío (Pie Chart)
     with col2:
         st.subheader("Contenedores: Llenos vs. Vacíos")
-        if not df_filtered.empty:
-            df_pie = df_filtered['full_/_empty_'].value_counts().reset_index()
-            df_pie.columns = ['Contenido', 'Conteo']
-            fig_pie = px.pie(
+        if aggregates['total']:
+            df_pie = aggregates['full_empty']
+            fig_pie = cached_figure(
+                'pie',
                 df_pie,
                 names='Contenido',
                 values='Conteo',
@@ -211,10 +208,10 @@ if not df.empty:
     # 3. Gráfico de Líneas: Movimientos por Fecha de Llegada (Line Chart)
     with col3:
         st.subheader("Movimientos Diarios (Llegada)")
-        if not df_filtered.empty:
-            df_line = df_filtered.groupby('arrival_date').size().reset_index(name='Conteo')
-            df_line.columns = ['Fecha de Llegada', 'Conteo']
-            fig_line = px.line(
+        if aggregates['total']:
+            df_line = aggregates['arrival_date']
+            fig_line = cached_figure(
+                'line',
                 df_line,
                 x='Fecha de Llegada',
                 y='Conteo',
@@ -222,7 +219,15 @@ if not df.empty:
             )
             st.plotly_chart(fig_line, width="stretch")
 
+    st.caption(f"⏱️ Gráficas generadas en {(perf_counter() - start) * 1000:.0f} ms")
 
+@st.fragment
+def render_table(df_filtered, filtered_rows, filter_values, filter_options, data_version):
+    """
+    Tabla filtrada. Como fragmento, cambiar de página, de orden o de columnas solo
+    vuelve a ejecutar esta función, sin recalcular filtros ni gráficas.
+    """
+    start = perf_counter()
     # -----------------------------------
     # Dataframe Filtrado
     # -----------------------------------
@@ -236,9 +241,6 @@ if not df.empty:
         'dgn_code', 'imo', 'call_sign', 'trip_number', 'delivery_port', 'dock', 'visit_no', 'eqd_-_qual'
     ]
 
-    # Reemplazar los NaN o None por un string vacío para mejor visualización
-    df_display = df_filtered[cols_to_display].fillna('')
-    
     # Renombrar columnas para la visualización en el DataFrame
     column_mapping = {
         'id':'ID',
@@ -268,9 +270,228 @@ if not df.empty:
         'eqd_-_qual': 'Eqd-Qual'
     }
 
+    # Columnas de la tabla: las de LAZY_COLUMNS no están en memoria y, si se activan,
+    # se leen por id solo para las filas que se muestran. Sin paginación la tabla
+    # tiene todas las filas filtradas, así que esas columnas no se ofrecen
+    if TABLE_PAGE_SIZE <= 0:
+        cols_to_display = [col for col in cols_to_display if col not in LAZY_COLUMNS]
+    table_cols = st.multiselect(
+        "Columnas de la tabla",
+        options=cols_to_display,
+        default=[col for col in cols_to_display if col not in LAZY_COLUMNS],
+        format_func=column_mapping.get,
+        key='table_columns',
+    )
+    table_cols = [col for col in cols_to_display if col in table_cols]
+    lazy_cols = tuple(col for col in table_cols if col in LAZY_COLUMNS)
+
+    if TABLE_PAGE_SIZE > 0:
+        # Tabla paginada: al navegador solo llega la página visible, sea cual sea el filtro
+        sort_options = [col for col in cols_to_display if col not in LAZY_COLUMNS]
+        if QUERY_MODE == 'sql':
+            sort_options = [col for col in cols_to_display if col in sortable_columns()]
+        page_sizes = sorted(set(PAGE_SIZES + [TABLE_PAGE_SIZE]))
+        col_size, col_sort, col_order, col_page = st.columns(4)
+        page_size = col_size.selectbox("Filas por página", page_sizes, index=page_sizes.index(TABLE_PAGE_SIZE))
+        sort = col_sort.selectbox("Ordenar por", sort_options, format_func=column_mapping.get)
+        ascending = col_order.selectbox("Orden", [False, True], format_func=lambda asc: "Ascendente" if asc else "Descendente")
+        pages = page_count(filtered_rows, page_size)
+        page = col_page.number_input(f"Página (de {pages})", min_value=1, max_value=pages, value=1, step=1)
+
+        if QUERY_MODE == 'sql':
+            try:
+                df_table = load_sql_page(filter_values, filter_options, sort, ascending, page, page_size, lazy_cols, data_version)
+            except mysql.connector.Error as e:
+                show_db_error(e)
+                st.stop()
+        else:
+            df_table = slice_page(df_filtered, sort, ascending, page, page_size)
+    else:
+        df_table = df_filtered
+
+    try:
+        df_table = with_lazy_columns(df_table, lazy_cols)
+    except mysql.connector.Error as e:
+        show_db_error(e)
+        st.stop()
+
+    # Reemplazar los NaN o None por un string vacío para mejor visualización
+    # (las columnas category no admiten '' como valor nuevo: se muestran como object;
+    # las fechas son datetime64 y se dejan como NaT, que la tabla muestra vacío)
+    df_display = df_table[table_cols]
+    df_display = df_display.astype({col: object for col in table_cols if is_categorical(df_display[col])})
+    df_display = df_display.fillna({col: '' for col in table_cols if col not in ['arrival_date', 'departure_date']})
+    
     df_display = df_display.rename(columns=column_mapping)
     
-    st.dataframe(df_display, width="stretch", hide_index=True,)
+    st.dataframe(
+        df_display,
+        width="stretch",
+        hide_index=True,
+        column_config={
+            'Fch. Llegada': st.column_config.DateColumn(format="YYYY-MM-DD"),
+            'Fch. Salida': st.column_config.DateColumn(format="YYYY-MM-DD"),
+        },
+    )
+
+    elapsed = (perf_counter() - start) * 1000
+    full_run = st.session_state.get('tiempo_ejecucion_completa')
+    st.caption(
+        f"⏱️ Tabla generada en {elapsed:.0f} ms"
+        + (f" (última ejecución completa del dashboard: {full_run:.0f} ms)" if full_run is not None else "")
+    )
+
+filter_options = None
+data = None
+try:
+    if QUERY_MODE == 'sql':
+        filter_options, total_rows, data_version = load_sql_filter_options()
+    else:
+        data = load_data()
+        if data is not None and not data.df.empty:
+            df = data.df
+            filter_options = {col: data.filter_index.options(col) for col in filter_cols}
+            total_rows = len(df)
+            data_version = data.version
+except mysql.connector.Error as e:
+    show_db_error(e)
+
+# --- Diseño del Dashboard ---
+st.title("🚢 Dashboard Interactivo: Movimiento de Contenedores")
+st.markdown("Filtra los datos usando la barra lateral izquierda y observa las métricas clave.")
+
+# Aviso cuando se muestran datos anteriores al último refresco previsto
+if data is not None:
+    status = movimientos_store.status()
+    minutes = int(status['age'] // 60)
+    if status['error']:
+        st.badge(f"Datos de hace {minutes} min: falló la última actualización", icon="⚠️", color="orange")
+    elif status['stale']:
+        st.badge(f"Datos de hace {minutes} min: actualizando...", icon="🔄", color="gray")
+
+if filter_options is not None:
+    
+    # -----------------------------------
+    # Sidebar para Filtros Interactivos
+    # -----------------------------------
+    st.sidebar.image('assets/amp_logo_espaciado.png', width='stretch')
+    st.sidebar.header("Opciones de Filtrado")
+
+    # Recarga completa a demanda (por defecto solo se traen las filas nuevas)
+    if st.sidebar.button("🔄 Recargar todos los datos"):
+        movimientos_store.request_full_reload()
+        st.cache_data.clear()
+        clear_query_cache()
+        lookup_cache.invalidate()
+        st.rerun()
+    
+    # Valores actuales de los filtros: los widgets guardan su estado en la sesión y
+    # se leen antes de dibujarlos para calcular los conteos de cada opción
+    filter_values = {}
+    for col in filter_cols:
+        if col in DATE_FILTERS:
+            if filter_options[col] is not None:
+                filter_values[col] = filter_state(col, filter_options[col])
+        else:
+            filter_values[col] = filter_state(col, filter_options[col], options=filter_options[col])
+
+    # Conteos por opción con todos los demás filtros aplicados (solo en modo memoria:
+    # en modo SQL costarían una consulta GROUP BY por filtro en cada interacción)
+    facet_counts = {}
+    if QUERY_MODE != 'sql':
+        mask, facet_counts = data.filter_index.facets(filter_values)
+
+    # Con el formulario, los cambios de varios filtros se aplican juntos con un solo
+    # rerun; en modo automático cada cambio se aplica (y recalcula todo) al momento
+    auto_apply = st.sidebar.toggle("Aplicar filtros automáticamente", value=FILTER_APPLY == 'auto', key='aplicar_automatico')
+    filters_box = st.sidebar.container() if auto_apply else st.sidebar.form("filtros", border=False)
+
+    for col in filter_cols:
+        if col in ['arrival_date', 'departure_date']:
+            # Manejo de Filtros de Fecha
+            if filter_options[col] is None:
+                filters_box.warning(f"No hay datos de fecha válidos para '{col}'.")
+                continue
+            min_date, max_date = filter_options[col]
+                
+            # --- CORRECCIÓN: Verifica si la fecha mínima y máxima son iguales ---
+            if min_date == max_date:
+                filters_box.info(f"Fecha Única para '{col}': {min_date}")
+                # Establecer el filtro al valor único y continuar
+                filter_values[col] = (min_date, max_date) 
+            else:
+                # Si hay un rango de fechas válido, muestra el slider
+                date_range = filters_box.slider(
+                    f"Selecciona rango de {col}",
+                    min_value=min_date,
+                    max_value=max_date,
+                    format="YYYY-MM-DD",
+                    key=f"filtro_{col}",
+                )
+                # El filtro de fecha se aplicará después
+                filter_values[col] = date_range
+            
+        else:
+            # Filtros de Multiselect (Operador, Puertos, Estatus, Lleno/Vacío, Registro)
+            unique_options = filter_options[col]
+            counts = dict(zip(unique_options, facet_counts[col].tolist())) if col in facet_counts else None
+            selected = filters_box.multiselect(
+                f"Filtrar por {col.replace('_', ' ').capitalize()}",
+                options=unique_options,
+                format_func=(lambda label, counts=counts: f"{label} ({counts[label]:,})") if counts else str,
+                key=f"filtro_{col}",
+            )
+            filter_values[col] = selected
+
+    if not auto_apply:
+        filters_box.form_submit_button("Aplicar filtros", type="primary", width="stretch")
+
+    # Métricas internas para dimensionar el despliegue
+    with st.sidebar.expander("Diagnóstico"):
+        st.caption("Pool de conexiones (esperas en ms)")
+        st.json(pool_stats())
+        st.caption("Caché de consultas (run_query)")
+        st.json(query_cache_stats())
+        st.caption("Tablas de lookup (comprobaciones de cambios y tablas releídas)")
+        st.json(lookup_cache.stats())
+        st.caption("Caché de figuras")
+        st.json(figure_cache_stats())
+        if QUERY_MODE != 'sql':
+            st.caption("Índice de filtros")
+            st.json({'version': data.version, 'MB': round(data.filter_index.memory_usage() / 2**20, 2)})
+        if QUERY_MODE != 'sql' and movimientos_store.last_load is not None:
+            st.caption("Última carga de datos")
+            st.json({**movimientos_store.last_load, 'refrescos': movimientos_store.refresh_stats()})
+        if QUERY_MODE != 'sql' and movimientos_store.memory_report is not None:
+            st.caption("Memoria por columna (modo compacto)")
+            st.dataframe(movimientos_store.memory_report)
+
+    # -----------------------------------
+    # Lógica de Filtrado
+    # -----------------------------------
+    if QUERY_MODE == 'sql':
+        try:
+            aggregates = load_sql_aggregates(filter_values, filter_options)
+            # Con la tabla paginada no se traen las filas filtradas, solo la página visible
+            df_filtered = load_filtered_data(filter_values, filter_options) if TABLE_PAGE_SIZE <= 0 else None
+        except mysql.connector.Error as e:
+            show_db_error(e)
+            st.stop()
+        filtered_rows = aggregates['total']
+    else:
+        # Una sola máscara con todos los filtros sobre las columnas precalculadas
+        # del índice (ver utils/filters.py), calculada junto con los conteos del
+        # sidebar; sin filtros activos no se copia nada
+        df_filtered = df if mask is None else df[mask]
+
+        aggregates = compute_aggregates(df_filtered)
+        filtered_rows = len(df_filtered)
+
+    st.info(f"Mostrando {filtered_rows} registros de {total_rows} totales.")
+
+    render_charts(aggregates)
+    render_table(df_filtered, filtered_rows, filter_values, filter_options, data_version)
+    st.session_state['tiempo_ejecucion_completa'] = (perf_counter() - script_start) * 1000
 
 else:
     st.warning("No se pudieron cargar los datos. Por favor, revisa la configuración de la base de datos.")
\ No newline at end of file
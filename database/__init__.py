@@ -1,25 +1,111 @@
+import copy
 import os
-import streamlit as st 
+import threading
 import mysql.connector
 from dotenv import load_dotenv
+from database.cache import QueryCache, query_key, query_tables
+from database.pool import ConnectionPool
+from database.singleflight import SingleFlight
 
 # Cargar las variables de entorno desde el archivo .env
 load_dotenv()
 
+# Tamaño máximo del pool y segundos de espera antes de fallar si está agotado
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Segundos ociosa tras los que una conexión se comprueba con ping antes de reutilizarla
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "30"))
+# Caché de resultados de run_query: tamaño máximo en MB y TTL por defecto en segundos
+QUERY_CACHE_MB = float(os.getenv("QUERY_CACHE_MB", "64"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_query_cache = QueryCache(max_bytes=int(QUERY_CACHE_MB * 2**20), default_ttl=QUERY_CACHE_TTL)
+_query_flights = SingleFlight()
+
 def init_connector():
     return mysql.connector.connect(
         host=os.getenv("DB_HOST"),
-        port=os.getenv("DB_PORT"),
+        port=os.getenv("DB_PORT", 3306),
         database=os.getenv("DB_NAME"),
         user=os.getenv("DB_USER"),
         password=os.getenv("DB_PASSWD"),
     )
 
-#@st.cache_data(ttl = 60)
-def run_query(query, params=None):
-    conn = init_connector()
-    with conn.cursor(dictionary=True) as cursor:
-        cursor.execute(query, params or ())
-        result = cursor.fetchall()
-    conn.close()
-    return result
\ No newline at end of file
+def get_pool():
+    """Devuelve el pool de conexiones del proceso, creándolo en el primer uso."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    init_connector,
+                    size=DB_POOL_SIZE,
+                    timeout=DB_POOL_TIMEOUT,
+                    ping_interval=DB_POOL_PING_INTERVAL,
+                )
+    return _pool
+
+def get_connection():
+    """Context manager que presta una conexión del pool: `with get_connection() as conn:`."""
+    return get_pool().connection()
+
+def pool_stats():
+    return get_pool().stats()
+
+def _is_read(query):
+    return query.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH', 'SHOW')
+
+def run_query(query, params=None, ttl=None):
+    """
+    Ejecuta `query` y devuelve sus filas como diccionarios.
+    Las lecturas se guardan en la caché de resultados durante `ttl` segundos
+    (por defecto QUERY_CACHE_TTL; 0 para no cachear) con clave SQL + parámetros.
+    Cualquier otra sentencia se confirma con commit y después invalida las
+    entradas de las tablas que menciona.
+    Las lecturas idénticas concurrentes que no están en caché comparten una sola
+    ejecución en la base de datos.
+    """
+    params = params or ()
+    if not _is_read(query):
+        with get_connection() as conn:
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall() if cursor.with_rows else []
+            # El pool hace rollback al devolver la conexión: sin commit la escritura se perdería
+            conn.commit()
+        invalidate_tables(*query_tables(query))
+        return rows
+
+    key = query_key(query, params)
+    found, result = _query_cache.get(key)
+    if found:
+        return result
+
+    def fetch():
+        tables = query_tables(query)
+        # Si una escritura invalida estas tablas mientras corre la consulta, las filas
+        # pueden ser anteriores a ella y no se guardan
+        generation = _query_cache.generation(tables)
+        with get_connection() as conn:
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        _query_cache.set(key, rows, tables, ttl, generation=generation)
+        return rows
+
+    result, shared = _query_flights.do(key, fetch)
+    # Cada llamada recibe su propia lista, como en un acierto de caché
+    return copy.deepcopy(result) if shared else result
+
+def invalidate_tables(*tables):
+    """Descarta los resultados cacheados que leen alguna de `tables`; devuelve cuántos."""
+    return _query_cache.invalidate(*tables)
+
+def clear_query_cache():
+    _query_cache.clear()
+
+def query_cache_stats():
+    # single_flight: lecturas en curso, ejecutadas y compartidas con una idéntica concurrente
+    return {**_query_cache.stats(), 'single_flight': _query_flights.stats()}
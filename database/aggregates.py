@@ -0,0 +1,77 @@
+import pandas as pd
+from database.lookups import describe
+
+# Nombre de cada agregado -> columnas del DataFrame que consume su gráfica
+AGGREGATE_COLUMNS = {
+    'operator': ['Operador', 'Conteo'],
+    'full_empty': ['Contenido', 'Conteo'],
+    'arrival_date': ['Fecha de Llegada', 'Conteo'],
+}
+
+
+def _where(where, *extra):
+    clauses = ([f"({where})"] if where else []) + list(extra)
+    return f" WHERE {' AND '.join(clauses)}" if clauses else ''
+
+
+def fetch_aggregates(conn, maps, where='', params=()):
+    """
+    Calcula en la base de datos los conteos de las tres gráficas del dashboard
+    (GROUP BY operator, full_empty y arrival_date) con los mismos filtros que la
+    tabla, sin traer las filas. Devuelve el mismo diccionario que `compute_aggregates`.
+    """
+    params = list(params)
+    df_operator = pd.read_sql(
+        "SELECT operator, COUNT(*) AS n FROM movimiento_contenedores"
+        + _where(where, "operator IS NOT NULL")
+        + " GROUP BY operator ORDER BY n DESC",
+        conn, params=params or None,
+    )
+    df_content = pd.read_sql(
+        "SELECT full_empty, COUNT(*) AS n FROM movimiento_contenedores"
+        + _where(where)
+        + " GROUP BY full_empty",
+        conn, params=params or None,
+    )
+    df_arrival = pd.read_sql(
+        "SELECT arrival_date, COUNT(*) AS n FROM movimiento_contenedores"
+        + _where(where, "arrival_date IS NOT NULL")
+        + " GROUP BY arrival_date ORDER BY arrival_date",
+        conn, params=params or None,
+    )
+
+    # Varios códigos pueden compartir descripción (p. ej. 'Desconocido'): se suman
+    df_content['full_empty'] = describe(df_content['full_empty'], 'content', maps)
+    df_content = df_content.groupby('full_empty', sort=False)['n'].sum().sort_values(ascending=False).reset_index()
+    df_arrival['arrival_date'] = pd.to_datetime(df_arrival['arrival_date'], errors='coerce').astype('datetime64[ns]')
+
+    aggregates = {
+        'total': int(df_content['n'].sum()),
+        'operator': df_operator,
+        'full_empty': df_content,
+        'arrival_date': df_arrival,
+    }
+    for name, columns in AGGREGATE_COLUMNS.items():
+        aggregates[name].columns = columns
+    return aggregates
+
+
+def compute_aggregates(df):
+    """
+    Calcula en pandas los conteos de las tres gráficas a partir del DataFrame filtrado.
+    Devuelve {'total': filas, 'operator': ..., 'full_empty': ..., 'arrival_date': ...}.
+    """
+    def value_counts(series):
+        # En columnas category value_counts también lista las categorías sin filas
+        counts = series.value_counts()
+        return counts[counts > 0].reset_index()
+
+    aggregates = {
+        'total': len(df),
+        'operator': value_counts(df['operator']),
+        'full_empty': value_counts(df['full_/_empty_']),
+        'arrival_date': df.groupby('arrival_date').size().reset_index(name='Conteo'),
+    }
+    for name, columns in AGGREGATE_COLUMNS.items():
+        aggregates[name].columns = columns
+    return aggregates
@@ -0,0 +1,125 @@
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Tablas que aparecen en una consulta (FROM/JOIN/INTO/UPDATE, con o sin comillas invertidas)
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)`?", re.IGNORECASE)
+
+
+def query_tables(query):
+    """Nombres (en minúsculas) de las tablas referenciadas por `query`."""
+    return {table.lower() for table in _TABLE_PATTERN.findall(query)}
+
+
+def query_key(query, params):
+    """Clave de caché: el SQL con los espacios normalizados más los parámetros."""
+    return ' '.join(query.split()), repr(params)
+
+
+class QueryCache:
+    """
+    Caché LRU de resultados de consultas, acotada en bytes, con TTL por entrada,
+    invalidación por nombre de tabla y contadores de aciertos/fallos.
+
+    Los resultados se guardan serializados con pickle: el tamaño contabilizado es
+    exacto y cada acierto devuelve una copia nueva, así que quien llama puede
+    modificarla sin afectar a la caché.
+
+    Cada tabla tiene un contador de generación que aumenta al invalidarla: quien
+    lee toma `generation(tables)` antes de ejecutar la consulta y lo pasa a `set`,
+    que descarta el resultado si entretanto una escritura invalidó esas tablas.
+    """
+
+    def __init__(self, max_bytes, default_ttl):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # clave -> (resultado serializado, vence, tablas)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._generations = {}
+        # Aumenta con clear(): invalida también las lecturas en curso de cualquier tabla
+        self._epoch = 0
+
+    def get(self, key):
+        """Devuelve (True, resultado) si la clave está vigente, o (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            payload = entry[0]
+        return True, pickle.loads(payload)
+
+    def generation(self, tables):
+        """Estado de invalidación de `tables`, para pasarlo a `set`."""
+        with self._lock:
+            return self._generation(tables)
+
+    def set(self, key, result, tables, ttl=None, generation=None):
+        """
+        Guarda `result` durante `ttl` segundos (por defecto `default_ttl`). Si se pasa
+        `generation` y alguna de las tablas se ha invalidado desde entonces, no se guarda.
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        payload = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation(tables):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (payload, time.monotonic() + ttl, frozenset(tables))
+            self.bytes += len(payload)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *tables):
+        """Elimina las entradas que leen alguna de `tables`. Devuelve cuántas se eliminaron."""
+        tables = {table.lower() for table in tables}
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            keys = [key for key, entry in self._entries.items() if entry[2] & tables]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def _generation(self, tables):
+        return self._epoch, tuple(self._generations.get(table.lower(), 0) for table in sorted(tables))
+
+    def _remove(self, key):
+        payload = self._entries.pop(key)[0]
+        self.bytes -= len(payload)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'MB': round(self.bytes / 2**20, 2),
+                'max_MB': round(self.max_bytes / 2**20, 2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from database import DB_POOL_SIZE, get_connection
+from database.lookups import LOOKUP_TABLES, fetch_lookup_map, lookup_signature
+
+# Segundos máximos que se reutilizan los mapas de lookup sin releerlos completos
+LOOKUP_TTL = int(os.getenv("LOOKUP_TTL", "86400"))
+# Segundos entre comprobaciones de cambios (filas + CHECKSUM TABLE) de las tablas de lookup
+LOOKUP_CHECK_INTERVAL = int(os.getenv("LOOKUP_CHECK_INTERVAL", "60"))
+
+# Tablas de lookup que se leen a la vez, cada una con su propia conexión del pool.
+# Se deja al menos una conexión libre para quien carga los movimientos mientras tanto
+LOOKUP_WORKERS = max(1, min(len(LOOKUP_TABLES), DB_POOL_SIZE - 1))
+
+# Un hilo coordina la comprobación de cambios y el resto lee las tablas
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lookups')
+_fetch_executor = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix='lookups-fetch')
+
+
+def _fetch_one(name):
+    with get_connection() as conn:
+        return fetch_lookup_map(conn, name)
+
+
+class LookupCache:
+    """
+    Mapas de lookup ({nombre: {código: descripción}}) compartidos por el proceso.
+
+    Cada LOOKUP_CHECK_INTERVAL segundos se compara la firma de las tablas (filas y
+    CHECKSUM TABLE, ver database.lookups.lookup_signature) con la de la última
+    lectura, y solo se vuelven a leer, en paralelo y cada una con una conexión del
+    pool (a lo sumo LOOKUP_WORKERS a la vez), las tablas que han cambiado; cada
+    LOOKUP_TTL se releen todas por si acaso.
+    Un mapa cuyo contenido no cambia conserva el mismo objeto, así que quien lo usa
+    puede detectar qué lookups cambiaron comparando los mapas.
+
+    `get_async` devuelve un Future: quien carga los movimientos puede lanzar su
+    consulta mientras tanto y esperar a los mapas solo cuando los necesita, de modo
+    que el tiempo total lo marca la consulta más lenta y no la suma de todas.
+    Las llamadas concurrentes comparten la misma lectura en curso. Quien ya tiene
+    una conexión del pool y no puede contar con otra libre la pasa como `conn`: la
+    lectura se hace entonces en su hilo, tabla a tabla, con esa conexión.
+    """
+
+    def __init__(self, ttl, check_interval):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._maps = None
+        self._signature = {}
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._pending = None
+        # Lo activa invalidate(): la siguiente lectura relee todas las tablas
+        self._force_full = False
+        # Aumenta cada vez que cambia el contenido de algún mapa (sirve como clave de caché)
+        self.version = 0
+        self.checks = 0
+        self.reloaded_tables = 0
+
+    def get(self, conn=None):
+        """Devuelve los mapas, comprobando antes si han cambiado cuando toca."""
+        return self.get_async(conn).result()
+
+    def get_async(self, conn=None):
+        """
+        Devuelve un Future con los mapas; ya resuelto si no toca comprobarlos o si se
+        pasa `conn`, en cuyo caso la lectura se hace en la llamada con esa conexión.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._maps is not None
+                and not self._force_full
+                and now - self._checked_at < self.check_interval
+                and now - self._loaded_at < self.ttl
+            ):
+                future = Future()
+                future.set_result(self._maps)
+                return future
+            if self._pending is not None:
+                return self._pending
+            if conn is None:
+                self._pending = _executor.submit(self._refresh)
+                return self._pending
+            future = self._pending = Future()
+
+        try:
+            future.set_result(self._refresh(conn))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def invalidate(self):
+        """Fuerza una relectura completa en la siguiente llamada."""
+        with self._lock:
+            self._force_full = True
+
+    def _refresh(self, conn=None):
+        try:
+            started = time.monotonic()
+            with self._lock:
+                forced = self._force_full
+            if conn is not None:
+                signature = lookup_signature(conn)
+            else:
+                with get_connection() as own_conn:
+                    signature = lookup_signature(own_conn)
+            full = forced or self._maps is None or started - self._loaded_at >= self.ttl
+            names = [
+                name for name, (table, _, _) in LOOKUP_TABLES.items()
+                if full or signature[table] != self._signature.get(table)
+            ]
+            if conn is not None:
+                fetched = {name: fetch_lookup_map(conn, name) for name in names}
+            else:
+                futures = {name: _fetch_executor.submit(_fetch_one, name) for name in names}
+                fetched = {name: future.result() for name, future in futures.items()}
+
+            maps = dict(self._maps or {})
+            changed = False
+            for name, lookup_map in fetched.items():
+                # Un mapa igual al anterior conserva el objeto anterior
+                if lookup_map != maps.get(name):
+                    maps[name] = lookup_map
+                    changed = True
+            with self._lock:
+                self._maps, self._signature, self._checked_at = maps, signature, started
+                if changed:
+                    self.version += 1
+                if full:
+                    self._loaded_at = started
+                if forced:
+                    self._force_full = False
+                self.checks += 1
+                self.reloaded_tables += len(names)
+            return maps
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def stats(self):
+        with self._lock:
+            return {'checks': self.checks, 'reloaded_tables': self.reloaded_tables}
+
+
+lookup_cache = LookupCache(LOOKUP_TTL, LOOKUP_CHECK_INTERVAL)
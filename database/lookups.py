@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# Tablas de lookup: nombre -> (tabla, columna de código, columna de descripción)
+LOOKUP_TABLES = {
+    'status': ('estatus_contenedor', 'code', 'description'),
+    'content': ('contenido_contenedor', 'code', 'description'),
+    'ports': ('puertosInternacionales', 'codPaisPuerto', 'descripcion'),
+    'eqd_qual': ('calificador_de_equipo', 'code', 'description'),
+}
+
+# Columnas de descripción del dashboard: destino -> (columna de código, lookup)
+DESCRIPTION_COLUMNS = {
+    'status_': ('status', 'status'),
+    'full_/_empty_': ('full_empty', 'content'),
+    'port_register_': ('port_register', 'ports'),
+    'loading_port_': ('loading_port', 'ports'),
+    'discharge_port': ('discharge_port', 'ports'),
+    'delivery_port': ('delivery_port', 'ports'),
+    'eqd_-_qual': ('eqd_qual', 'eqd_qual'),
+}
+
+# Valor mostrado cuando un código no existe en su tabla de lookup (excepto puertos)
+UNKNOWN = 'Desconocido'
+
+
+def lookup_join_sql(columns, alias='m'):
+    """
+    Genera la lista de SELECT y los LEFT JOIN que resuelven las descripciones en la
+    base de datos, con los mismos fallbacks que `describe`. Las columnas de `columns`
+    que son destino de una descripción (p. ej. 'discharge_port') se sustituyen por
+    la expresión; el resto se leen de la tabla `alias`.
+    Cada lookup se une como tabla derivada agrupada por código para que un código
+    duplicado no multiplique las filas.
+    """
+    expressions, joins = {}, []
+    for target, (source, lookup) in DESCRIPTION_COLUMNS.items():
+        table, code_col, desc_col = LOOKUP_TABLES[lookup]
+        join_alias = f"l_{source}"
+        joins.append(
+            f"LEFT JOIN (SELECT {code_col} AS code, MAX({desc_col}) AS description FROM {table} GROUP BY {code_col}) {join_alias}"
+            f" ON {join_alias}.code = {alias}.{source}"
+        )
+        if lookup == 'ports':
+            expressions[target] = (
+                f"CASE WHEN {alias}.{source} IS NULL THEN '' "
+                f"ELSE COALESCE({join_alias}.description, {alias}.{source}) END"
+            )
+        else:
+            expressions[target] = f"COALESCE({join_alias}.description, '{UNKNOWN}')"
+
+    select = [f"{expressions.pop(col)} AS `{col}`" if col in expressions else f"{alias}.{col}" for col in columns]
+    select += [f"{expression} AS `{target}`" for target, expression in expressions.items()]
+    return ', '.join(select), ' '.join(joins)
+
+
+def fetch_lookup_map(conn, name):
+    """Lee la tabla de lookup `name` y devuelve {código: descripción}."""
+    table, code_col, desc_col = LOOKUP_TABLES[name]
+    df_lookup = pd.read_sql(f"SELECT {code_col}, {desc_col} FROM {table}", conn)
+    return df_lookup.set_index(code_col)[desc_col].to_dict()
+
+
+def fetch_lookup_maps(conn):
+    """
+    Lee las tablas de lookup y devuelve un diccionario {nombre: {código: descripción}}.
+    """
+    return {name: fetch_lookup_map(conn, name) for name in LOOKUP_TABLES}
+
+
+def lookup_checksums(conn):
+    """
+    Devuelve {tabla: checksum} de las tablas de lookup con CHECKSUM TABLE, para
+    detectar si han cambiado sin releerlas.
+    """
+    tables = [table for table, _, _ in LOOKUP_TABLES.values()]
+    with conn.cursor() as cursor:
+        cursor.execute("CHECKSUM TABLE " + ", ".join(tables))
+        rows = cursor.fetchall()
+    # MySQL devuelve la tabla como 'base_de_datos.tabla'
+    return {table.split('.')[-1]: checksum for table, checksum in rows}
+
+
+def lookup_signature(conn):
+    """
+    Devuelve {tabla: (filas, checksum)} de las tablas de lookup: una comprobación
+    barata de si alguna ha cambiado desde la última lectura.
+    """
+    tables = [table for table, _, _ in LOOKUP_TABLES.values()]
+    with conn.cursor() as cursor:
+        cursor.execute(" UNION ALL ".join(f"SELECT '{table}', COUNT(*) FROM {table}" for table in tables))
+        counts = dict(cursor.fetchall())
+    checksums = lookup_checksums(conn)
+    return {table: (counts[table], checksums.get(table)) for table in tables}
+
+
+def map_unique(series, func, na_value):
+    """
+    Aplica `func` una sola vez por cada valor distinto de `series` y reparte el
+    resultado a todas las filas; los nulos (None/NaN) reciben `na_value`.
+    Las columnas de código tienen pocos cientos de valores distintos, así que el
+    coste en Python deja de depender del número de filas.
+    """
+    codes, uniques = pd.factorize(series)
+    values = np.empty(len(uniques) + 1, dtype=object)
+    values[:-1] = [func(code) for code in uniques]
+    # Los nulos se factorizan como -1, que apunta al último elemento
+    values[-1] = na_value
+    return pd.Series(values[codes], index=series.index, name=series.name, dtype=object)
+
+
+def describe(series, lookup, maps):
+    """
+    Traduce una serie de códigos a descripciones.
+    Los puertos sin descripción conservan el código original y los nulos quedan como '';
+    en el resto de lookups los códigos desconocidos o nulos pasan a 'Desconocido'.
+    """
+    lookup_map = maps[lookup]
+    if lookup == 'ports':
+        # Se asegura que la clave sea string antes de la búsqueda
+        return map_unique(series, lambda code: lookup_map.get(str(code), code), '')
+
+    def map_code(code):
+        description = lookup_map.get(code)
+        return UNKNOWN if description is None or pd.isna(description) else description
+
+    return map_unique(series, map_code, UNKNOWN)
+
+
+def apply_lookups(df, maps):
+    """
+    Añade (o reemplaza) las columnas de descripción del dashboard a partir de los códigos.
+    Modifica `df` en sitio y lo devuelve.
+    """
+    for target, (source, lookup) in DESCRIPTION_COLUMNS.items():
+        df[target] = describe(df[source], lookup, maps)
+    return df
@@ -0,0 +1,595 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass
+import pandas as pd
+import pyarrow as pa
+from database import DB_POOL_SIZE, get_connection, run_query
+from database.lookup_cache import lookup_cache
+from database.lookups import (
+    DESCRIPTION_COLUMNS, apply_lookups, describe, fetch_lookup_maps, lookup_checksums, lookup_join_sql,
+)
+from database.singleflight import SingleFlight
+from database.snapshot import load_snapshot, save_snapshot
+from database.streaming import ColumnBuffers, read_chunks
+from utils.filters import FilterIndex
+from utils.memory import COMPACT_COLUMNS, compact_frame, concat_compact, memory_report
+
+# Modo de carga: 'incremental' (solo filas nuevas en cada refresco) o 'full' (tabla completa)
+LOAD_MODE = os.getenv("LOAD_MODE", "incremental")
+# Segundos entre refrescos de los datos en memoria
+LOAD_TTL = int(os.getenv("LOAD_TTL", "600"))
+# Segundos entre recargas completas en modo incremental
+FULL_RELOAD_INTERVAL = int(os.getenv("FULL_RELOAD_INTERVAL", "86400"))
+# Dónde se traducen los códigos a descripciones: 'pandas' (mapas en memoria) o 'sql' (LEFT JOIN)
+LOOKUP_MODE = os.getenv("LOOKUP_MODE", "pandas")
+# Guarda las columnas de baja cardinalidad como `category` (ver utils.memory)
+COMPACT_DTYPES = os.getenv("COMPACT_DTYPES", "1") == "1"
+# Filas por bloque en la carga en streaming del store (0 para leer todo con pd.read_sql)
+LOAD_CHUNK_SIZE = int(os.getenv("LOAD_CHUNK_SIZE", "100000"))
+# Archivo Arrow del último frame procesado (vacío para desactivarlo)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", ".cache/movimientos.arrow")
+# Segundos mínimos entre escrituras del snapshot tras cargas incrementales
+SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", "3600"))
+# Refresco en segundo plano: las sesiones nunca esperan una carga y reciben los
+# últimos datos buenos mientras se actualizan ('0' para refrescar dentro de la petición)
+BACKGROUND_REFRESH = os.getenv("BACKGROUND_REFRESH", "1") == "1"
+# Segundos antes de vencer el TTL en los que el hilo de fondo empieza el refresco
+REFRESH_AHEAD = int(os.getenv("REFRESH_AHEAD", "60"))
+# Segundos de espera antes de reintentar un refresco fallido
+REFRESH_RETRY = int(os.getenv("REFRESH_RETRY", "60"))
+# Versión del formato del frame guardado; un snapshot de otra versión se descarta
+SNAPSHOT_FORMAT = 3
+
+logger = logging.getLogger(__name__)
+
+MOVIMIENTOS_COLUMNS = [
+    'id', 'operator', 'trip_number', 'ship_name', 'loading_port', 'discharge_port', 'delivery_port', 'dock',
+    'arrival_date', 'arrival_time', 'departure_date', 'departure_time', 'container_number',
+    'size', 'type', 'status', 'full_empty', 'temperature', 'description', 'dgn_code', 'imo',
+    'call_sign', 'visit_no', 'eqd_qual', 'port_register',
+]
+
+# Columnas pesadas o poco usadas que no se cargan con los movimientos: se leen por id
+# solo para las filas que se muestran, cuando el usuario las activa en la tabla
+LAZY_COLUMNS = [
+    col.strip() for col in os.getenv("LAZY_COLUMNS", "description,call_sign,visit_no,dgn_code").split(",")
+    if col.strip() in MOVIMIENTOS_COLUMNS
+]
+# Columnas que se cargan siempre (filtros, gráficas y columnas habituales de la tabla)
+LOADED_COLUMNS = [col for col in MOVIMIENTOS_COLUMNS if col not in LAZY_COLUMNS]
+# Filas por consulta al leer columnas diferidas por id
+LAZY_FETCH_BATCH = 1000
+
+
+# Columnas de código que solo se usan para traducir descripciones (no se muestran)
+SOURCE_CODE_COLUMNS = {source for target, (source, _) in DESCRIPTION_COLUMNS.items() if target != source}
+
+
+def movimientos_query(min_id=None, where='', params=(), max_id=None, order_by="m.id DESC", columns=LOADED_COLUMNS):
+    """
+    Construye la consulta de movimiento_contenedores, por defecto ordenada por id descendente.
+    Si se indica `min_id` (o `max_id`), solo incluye las filas con id mayor (o menor o
+    igual); `where` y `params` añaden una condición parametrizada (ver
+    database.query_builder.build_where). En LOOKUP_MODE 'sql' las columnas de
+    descripción se resuelven con LEFT JOIN. Solo se leen las `columns` (por defecto
+    LOADED_COLUMNS). Devuelve (consulta, parámetros).
+    """
+    if LOOKUP_MODE == 'sql':
+        select, joins = lookup_join_sql(columns)
+        query = f"SELECT {select} FROM movimiento_contenedores m {joins}"
+    else:
+        query = f"SELECT {', '.join(columns)} FROM movimiento_contenedores m"
+    clauses, params = _id_clauses(min_id, where, params, max_id)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += f" ORDER BY {order_by}"
+    return query, params
+
+
+def _id_clauses(min_id, where, params, max_id=None):
+    clauses, params = ([f"({where})"] if where else []), list(params)
+    if min_id is not None:
+        clauses.append("m.id > %s")
+        params.append(min_id)
+    if max_id is not None:
+        clauses.append("m.id <= %s")
+        params.append(max_id)
+    return clauses, params
+
+
+def fetch_movimientos(conn, min_id=None, where='', params=()):
+    """Lee movimiento_contenedores de una vez (ver `movimientos_query`)."""
+    query, params = movimientos_query(min_id, where, params)
+    return pd.read_sql(query, conn, params=params or None)
+
+
+def prepare_movimientos(df, maps):
+    """
+    Mapea los códigos a descripciones (si `maps` no es None) y convierte los tipos
+    usados por los filtros.
+    """
+    if maps is not None:
+        apply_lookups(df, maps)
+
+    # Conversión de tipos de datos para filtros (especialmente fechas). Las fechas se
+    # mantienen como datetime64[ns]: comparar y agrupar es vectorizado, a diferencia
+    # de una columna object de datetime.date. normalize() descarta una posible hora
+    # para que sigan siendo fechas (el slider y los gráficos comparan y agrupan por día)
+    for prefix in ('arrival', 'departure'):
+        dates = pd.to_datetime(df[f'{prefix}_date'], errors='coerce').astype('datetime64[ns]').dt.normalize()
+        # Las columnas TIME de MySQL llegan como timedelta (hora del día)
+        times = pd.to_timedelta(df[f'{prefix}_time'], errors='coerce')
+        df[f'{prefix}_date'] = dates
+        df[f'{prefix}_time'] = times
+        df[f'{prefix}_ts'] = (dates + times).astype('datetime64[ns]')
+    return df
+
+
+def _index_path():
+    # Índice de filtros (utils.filters.FilterIndex) del frame guardado en SNAPSHOT_PATH
+    return f"{SNAPSHOT_PATH}.index.npz"
+
+
+def _resolve_maps(conn, maps):
+    # `maps` puede ser un Future (ver database.lookup_cache): se espera aquí, cuando
+    # la consulta de movimientos ya se ha lanzado
+    if LOOKUP_MODE == 'sql':
+        return None
+    if isinstance(maps, Future):
+        return maps.result()
+    return fetch_lookup_maps(conn) if maps is None else maps
+
+
+def sortable_columns():
+    """
+    Columnas por las que se puede ordenar una página en la base de datos: las de la
+    tabla que se muestran tal cual y, en LOOKUP_MODE 'sql', también las de descripción
+    (en modo 'pandas' la base de datos solo tiene sus códigos).
+    """
+    translated = {target for target, (source, _) in DESCRIPTION_COLUMNS.items() if target == source}
+    columns = [col for col in MOVIMIENTOS_COLUMNS if col not in translated and col not in SOURCE_CODE_COLUMNS]
+    if LOOKUP_MODE == 'sql':
+        columns += list(DESCRIPTION_COLUMNS)
+    return columns
+
+
+def fetch_movimientos_page(conn, maps=None, where='', params=(), sort='id', ascending=False,
+                           page=1, page_size=100, after_id=None, lazy_columns=()):
+    """
+    Lee y prepara una sola página (desde 1) de movimientos ordenados por `sort` (ver
+    `sortable_columns`) y después por id, con LOADED_COLUMNS más las `lazy_columns`
+    pedidas. Si se ordena por id y se conoce el último id de la página anterior
+    (`after_id`), la página se pide por keyset (`id < after_id`) en lugar de con
+    OFFSET, así que su coste no crece con el número de página.
+    """
+    if sort not in sortable_columns():
+        raise ValueError(f"No se puede ordenar por {sort!r}")
+    direction = 'ASC' if ascending else 'DESC'
+    clauses, params = ([f"({where})"] if where else []), list(params)
+    offset = (page - 1) * page_size
+    if sort == 'id' and after_id is not None:
+        clauses.append("m.id > %s" if ascending else "m.id < %s")
+        params.append(after_id)
+        offset = 0
+    column = f"`{sort}`" if sort in DESCRIPTION_COLUMNS else f"m.{sort}"
+    order_by = f"m.id {direction}" if sort == 'id' else f"{column} {direction}, m.id {direction}"
+    columns = LOADED_COLUMNS + [col for col in lazy_columns if col in LAZY_COLUMNS]
+    query, params = movimientos_query(where=' AND '.join(clauses), params=params, order_by=order_by, columns=columns)
+    query += " LIMIT %s OFFSET %s"
+    df = pd.read_sql(query, conn, params=params + [page_size, offset])
+    return prepare_movimientos(df, _resolve_maps(conn, maps))
+
+
+def with_lazy_columns(df, columns):
+    """
+    Devuelve una copia de `df` con las columnas diferidas `columns` (ver LAZY_COLUMNS)
+    leídas por id solo para sus filas, en lotes de LAZY_FETCH_BATCH ids. Las lecturas
+    pasan por la caché de resultados de `run_query`, así que volver a una página ya
+    vista no va a la base de datos.
+    """
+    columns = [col for col in columns if col in LAZY_COLUMNS and col not in df]
+    if not columns:
+        return df
+    ids = df['id'].tolist()
+    values = {}
+    for start in range(0, len(ids), LAZY_FETCH_BATCH):
+        batch = ids[start:start + LAZY_FETCH_BATCH]
+        rows = run_query(
+            f"SELECT id, {', '.join(columns)} FROM movimiento_contenedores"
+            f" WHERE id IN ({', '.join(['%s'] * len(batch))})",
+            tuple(batch),
+        )
+        values.update((row['id'], row) for row in rows)
+    df = df.copy(deep=False)
+    for col in columns:
+        df[col] = pd.Series([values.get(id_, {}).get(col) for id_ in ids], index=df.index, dtype=object)
+    return df
+
+
+def load_movimientos(conn, maps=None, **kwargs):
+    """
+    Lee (ver `fetch_movimientos`) y prepara los movimientos para el dashboard.
+    En LOOKUP_MODE 'pandas' las descripciones se mapean con `maps` (un diccionario o
+    un Future que lo produce), que se leen de la base de datos si no se pasan.
+    """
+    df = fetch_movimientos(conn, **kwargs)
+    return prepare_movimientos(df, _resolve_maps(conn, maps))
+
+
+def stream_movimientos(conn, maps=None, category_columns=(), min_id=None, where='', params=()):
+    """
+    Lee y prepara los movimientos en bloques de LOAD_CHUNK_SIZE filas con un cursor
+    sin buffer: cada bloque se mapea, se convierte y se copia en buffers columnares
+    preasignados (ver database.streaming.ColumnBuffers), y las `category_columns` se
+    codifican como category sobre la marcha. El pico de memoria queda cerca del
+    tamaño del frame final, en lugar de varias veces (tuplas + DataFrame + copias).
+    `maps` es como en `load_movimientos`; un Future se espera al llegar el primer bloque.
+    Devuelve (DataFrame, {columna: (bytes como object, bytes como category)}).
+    """
+    # El conteo fija el tamaño de los buffers; el id máximo acota la lectura a esas
+    # filas aunque se inserten otras mientras tanto
+    clauses, count_params = _id_clauses(min_id, where, params)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*), MAX(m.id) FROM movimiento_contenedores m"
+            + (" WHERE " + " AND ".join(clauses) if clauses else ""),
+            tuple(count_params),
+        )
+        rows, max_id = cursor.fetchone()
+
+    query, query_params = movimientos_query(min_id, where, params, max_id=max_id)
+    buffers = None
+    for chunk in read_chunks(conn, query, query_params, LOAD_CHUNK_SIZE):
+        if buffers is None:
+            maps = _resolve_maps(conn, maps)
+        chunk = prepare_movimientos(chunk, maps)
+        if buffers is None:
+            buffers = ColumnBuffers(rows, chunk, category_columns)
+        buffers.append(chunk)
+    return buffers.to_frame(), buffers.memory_sizes()
+
+
+@dataclass(frozen=True)
+class MovimientosData:
+    """
+    Versión publicada de los datos: el frame y su índice de filtros se sustituyen
+    juntos, de modo que una sesión nunca combina un frame con el índice de otro.
+    """
+    df: pd.DataFrame
+    filter_index: FilterIndex
+    version: int
+
+
+class MovimientosStore:
+    """
+    Mantiene en memoria el DataFrame procesado de movimiento_contenedores, compartido
+    por todas las sesiones del proceso.
+
+    En modo incremental guarda el mayor `id` cargado como high-water mark y en cada
+    refresco solo trae, mapea y convierte las filas con `id` superior, que se anteponen
+    al frame en caché. Los cambios en filas ya cargadas solo se recogen en una recarga
+    completa, que se hace a demanda o cada FULL_RELOAD_INTERVAL segundos.
+
+    Si SNAPSHOT_PATH está definido, el frame procesado se guarda en disco junto con
+    el high-water mark y los checksums de las tablas de lookup. Tras un reinicio se
+    parte de ese archivo (si los lookups no han cambiado) y solo se traen las filas
+    nuevas, en lugar de recargar toda la tabla.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._wake = threading.Event()
+        # Se activa cuando empieza el primer refresco (a partir de ahí `wait` espera a la llamada en curso)
+        self._started = threading.Event()
+        self._refresher = None
+        self.df = None
+        # Índice de filtros de self.df; None si hay que construirlo de cero al publicar
+        self.filter_index = None
+        self.data = None
+        self.watermark = None
+        self.lookup_checksums = None
+        # Mapas con los que están traducidas las descripciones del frame (LOOKUP_MODE 'pandas')
+        self.lookup_maps = None
+        self.refreshed_at = 0.0
+        self.full_loaded_at = 0.0
+        self.snapshot_saved_at = 0.0
+        self.memory_report = None
+        self.last_load = None
+        self.last_error = None
+        self.last_error_at = None
+        self._full_requested = False
+
+    def request_full_reload(self):
+        """Fuerza una recarga completa en el siguiente refresco."""
+        self._full_requested = True
+        self._wake.set()
+
+    def get(self):
+        """
+        Devuelve los datos en caché (MovimientosData). El frame devuelto es compartido
+        y no debe modificarse.
+
+        Con BACKGROUND_REFRESH nunca espera a la base de datos: los datos los refresca
+        un hilo de fondo antes de que venza el TTL y se sustituyen de forma atómica,
+        así que se devuelven siempre los últimos datos buenos (ver `status`). Antes de
+        la primera carga devuelve None, o lanza el error del último intento si falló.
+
+        Sin BACKGROUND_REFRESH refresca dentro de la llamada cuando vence el TTL; las
+        sesiones que piden un refresco mientras otro está en curso esperan a ese mismo
+        refresco y comparten su resultado (o su error) en lugar de lanzar otra carga.
+        """
+        if not BACKGROUND_REFRESH:
+            if self._refresh_due(time.monotonic()) > 0:
+                return self.data
+            return self.refresh()
+
+        self.start_refresher()
+        data = self.data
+        if data is None and self.last_error is not None and not self.refreshing():
+            raise self.last_error
+        return data
+
+    def refresh(self):
+        """Refresca los datos ahora (compartiendo un refresco ya en curso) y los devuelve."""
+        try:
+            data, _ = self._flight.do('movimientos', self._refresh)
+        except Exception as e:
+            self.last_error, self.last_error_at = e, time.monotonic()
+            raise
+        self.last_error = self.last_error_at = None
+        return data
+
+    def refreshing(self):
+        return self._flight.in_flight('movimientos')
+
+    def wait(self, timeout):
+        """
+        Espera hasta `timeout` segundos a que termine el refresco en curso. Si el hilo
+        de fondo aún no ha empezado el primero, espera también a que empiece.
+        """
+        deadline = time.monotonic() + timeout
+        if not self._started.wait(timeout):
+            return False
+        return self._flight.wait('movimientos', max(0.0, deadline - time.monotonic()))
+
+    def start_refresher(self):
+        """Arranca (una sola vez por proceso) el hilo que refresca los datos en segundo plano."""
+        if self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(target=self._run_refresher, name='movimientos-refresher', daemon=True)
+                self._refresher.start()
+
+    def _run_refresher(self):
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            delay = self._refresh_due(now)
+            if self.last_error_at is not None:
+                delay = max(delay, self.last_error_at + REFRESH_RETRY - now)
+            if delay > 0:
+                self._wake.wait(delay)
+                continue
+            try:
+                self.refresh()
+            except Exception:
+                # Las sesiones siguen con los últimos datos buenos; se reintenta tras REFRESH_RETRY
+                logger.exception("Falló el refresco de movimiento_contenedores")
+
+    def _refresh_due(self, now):
+        """Segundos que faltan para el próximo refresco (<= 0 si toca ya)."""
+        if self.data is None or self._full_requested:
+            return 0
+        # El hilo de fondo se adelanta REFRESH_AHEAD segundos al vencimiento del TTL
+        ahead = REFRESH_AHEAD if BACKGROUND_REFRESH else 0
+        return self.refreshed_at + LOAD_TTL - ahead - now
+
+    def status(self):
+        """Antigüedad de los datos publicados y estado del refresco, para el dashboard."""
+        age = time.monotonic() - self.refreshed_at if self.data is not None else None
+        return {
+            'age': age,
+            'stale': age is not None and age >= LOAD_TTL,
+            'refreshing': self.refreshing(),
+            'error': str(self.last_error) if self.last_error is not None else None,
+        }
+
+    def refresh_stats(self):
+        """Refrescos en curso, ejecutados y llamadas que esperaron a uno en curso en lugar de lanzar otro."""
+        return self._flight.stats()
+
+    def _refresh(self):
+        # Se llama ya dentro del single-flight: quien espera con `wait` ve la llamada en curso
+        self._started.set()
+        with self._lock:
+            now = time.monotonic()
+            if self._refresh_due(now) > 0:
+                return self.data
+
+            with get_connection() as conn:
+                if self.df is None and SNAPSHOT_PATH and not self._full_requested:
+                    self._restore_snapshot(conn)
+
+                full = (
+                    self.df is None
+                    or self.watermark is None
+                    or self._full_requested
+                    or LOAD_MODE != 'incremental'
+                    or now - self.full_loaded_at >= FULL_RELOAD_INTERVAL
+                )
+                if not full and LOOKUP_MODE == 'pandas':
+                    full = not self._apply_lookup_changes(conn, self._lookup_maps(conn).result())
+                elif not full:
+                    # Las descripciones vienen de los JOIN de la carga: si algún lookup
+                    # ha cambiado, solo una recarga completa las actualiza en todas las filas
+                    full = lookup_checksums(conn) != self.lookup_checksums
+                if full:
+                    self._load_full(conn)
+                else:
+                    self._load_increment(conn)
+
+            self.refreshed_at = now
+            if full:
+                self.full_loaded_at = now
+                self._full_requested = False
+            # El frame y su índice se publican juntos con una sola asignación
+            if self.data is None or self.data.df is not self.df:
+                self._publish()
+            return self.data
+
+    def _publish(self):
+        version = self.data.version + 1 if self.data is not None else 1
+        self.data = MovimientosData(self.df, self._filter_index(), version)
+
+    def _filter_index(self):
+        if self.filter_index is None:
+            self.filter_index = FilterIndex(self.df)
+        return self.filter_index
+
+    def _load_full(self, conn):
+        start = time.perf_counter()
+        # Los checksums se leen antes que los lookups: si cambian entretanto, el
+        # snapshot quedará marcado como desactualizado y no se reutilizará. En
+        # LOOKUP_MODE 'sql' se leen siempre, para detectar cambios en cada refresco
+        checksums = lookup_checksums(conn) if SNAPSHOT_PATH or LOOKUP_MODE == 'sql' else None
+        # Los lookups se leen en paralelo (con otras conexiones) mientras corre la consulta principal
+        maps = self._lookup_maps(conn) if LOOKUP_MODE == 'pandas' else None
+        df, report = self._fetch(conn, maps)
+        if report is not None:
+            self.memory_report = report
+        self.df = df
+        self.filter_index = None
+        self.lookup_maps = maps.result() if maps is not None else None
+        self.watermark = int(df['id'].max()) if not df.empty else None
+        self.lookup_checksums = checksums
+        self._record_load('completa', start, len(df))
+        self._save_snapshot()
+
+    def _load_increment(self, conn):
+        start = time.perf_counter()
+        df_new, _ = self._fetch(conn, self.lookup_maps, min_id=self.watermark)
+        if df_new.empty:
+            return
+        # Las filas nuevas tienen id mayor: van delante para mantener el orden descendente
+        self.df = concat_compact(df_new, self.df)
+        # El índice se extiende con las filas nuevas en lugar de reconstruirse
+        if self.filter_index is not None:
+            self.filter_index = self.filter_index.prepend(df_new)
+        self.watermark = int(df_new['id'].max())
+        self._record_load('incremental', start, len(df_new))
+        if time.monotonic() - self.snapshot_saved_at >= SNAPSHOT_INTERVAL:
+            self._save_snapshot()
+
+    def _lookup_maps(self, conn):
+        """
+        Future con los mapas de lookup. El store ya tiene `conn` del pool: si el pool
+        no tiene más conexiones (DB_POOL_SIZE 1), los lookups se leen con ella.
+        """
+        return lookup_cache.get_async(conn if DB_POOL_SIZE < 2 else None)
+
+    def _fetch(self, conn, maps, **kwargs):
+        """Lee y prepara movimientos; devuelve (df, informe de memoria o None)."""
+        category_columns = COMPACT_COLUMNS if COMPACT_DTYPES else ()
+        if LOAD_CHUNK_SIZE > 0:
+            df, sizes = stream_movimientos(conn, maps, category_columns=category_columns, **kwargs)
+            return df, memory_report(sizes) if sizes else None
+        df = load_movimientos(conn, maps, **kwargs)
+        return df, compact_frame(df, category_columns) if category_columns else None
+
+    def _apply_lookup_changes(self, conn, maps):
+        """
+        Vuelve a traducir las columnas de descripción de los lookups que han cambiado
+        desde la última carga (ver database.lookup_cache), sobre una copia del frame
+        que se publica como una versión nueva. Devuelve False si hace falta una recarga
+        completa: las columnas que se sustituyen por su descripción (discharge_port,
+        delivery_port) ya no conservan el código.
+        """
+        if self.lookup_maps is None:
+            # Frame restaurado de un snapshot con los mismos checksums que los lookups actuales
+            self.lookup_maps = maps
+            return True
+        changed = {
+            name for name, lookup_map in maps.items()
+            if lookup_map is not self.lookup_maps.get(name) and lookup_map != self.lookup_maps.get(name)
+        }
+        if not changed:
+            self.lookup_maps = maps
+            return True
+        targets = {target: (source, lookup) for target, (source, lookup) in DESCRIPTION_COLUMNS.items() if lookup in changed}
+        if any(target == source for target, (source, _) in targets.items()):
+            return False
+
+        start = time.perf_counter()
+        df = self.df.copy(deep=False)
+        for target, (source, lookup) in targets.items():
+            df[target] = describe(df[source], lookup, maps)
+        if COMPACT_DTYPES:
+            compact_frame(df, [target for target in targets if target in COMPACT_COLUMNS])
+        self.df = df
+        self.filter_index = None
+        self.lookup_maps = maps
+        self.lookup_checksums = lookup_checksums(conn) if SNAPSHOT_PATH else None
+        self._record_load('lookups: ' + ', '.join(sorted(changed)), start, len(df))
+        self._save_snapshot()
+        return True
+
+    def _restore_snapshot(self, conn):
+        start = time.perf_counter()
+        snapshot = load_snapshot(SNAPSHOT_PATH)
+        if snapshot is None:
+            return
+        df, meta = snapshot
+        if (
+            meta.get('format') != SNAPSHOT_FORMAT
+            or meta.get('columns') != LOADED_COLUMNS
+            or meta.get('lookup_mode') != LOOKUP_MODE
+            or meta.get('lookup_checksums') != lookup_checksums(conn)
+        ):
+            logger.info("Snapshot %s descartado: el esquema o los lookups han cambiado", SNAPSHOT_PATH)
+            return
+
+        self.df = df
+        # El índice de filtros guardado con el snapshot evita reconstruirlo en el arranque
+        index = FilterIndex.load(_index_path())
+        if index is not None and index[1].get('snapshot_id') == meta.get('snapshot_id') and index[0].rows == len(df):
+            self.filter_index = index[0]
+        self.watermark = meta['watermark']
+        self.lookup_checksums = meta['lookup_checksums']
+        # La antigüedad de la última recarga completa sobrevive al reinicio
+        self.full_loaded_at = time.monotonic() - (time.time() - meta['full_loaded_at'])
+        self.snapshot_saved_at = time.monotonic()
+        self._record_load('snapshot', start, len(df))
+
+    def _save_snapshot(self):
+        if not SNAPSHOT_PATH or self.watermark is None:
+            return
+        meta = {
+            'format': SNAPSHOT_FORMAT,
+            'watermark': self.watermark,
+            'lookup_checksums': self.lookup_checksums,
+            'columns': LOADED_COLUMNS,
+            'lookup_mode': LOOKUP_MODE,
+            'full_loaded_at': time.time() - (time.monotonic() - self.full_loaded_at),
+            # Enlaza el snapshot con el índice de filtros guardado junto a él
+            'snapshot_id': uuid.uuid4().hex,
+        }
+        try:
+            self._filter_index().save(_index_path(), {'snapshot_id': meta['snapshot_id']})
+            save_snapshot(self.df, SNAPSHOT_PATH, meta)
+        except (OSError, pa.ArrowException) as e:
+            # El snapshot es solo una optimización del arranque: no interrumpe la carga
+            logger.warning("No se pudo guardar el snapshot %s: %s", SNAPSHOT_PATH, e)
+            return
+        self.snapshot_saved_at = time.monotonic()
+
+    def _record_load(self, kind, start, rows):
+        self.last_load = {'tipo': kind, 'filas': rows, 'segundos': round(time.perf_counter() - start, 3)}
+
+
+movimientos_store = MovimientosStore()
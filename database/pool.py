@@ -0,0 +1,126 @@
+import collections
+import threading
+import time
+from contextlib import contextmanager
+from mysql.connector.errors import PoolError
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones acotado, seguro entre hilos y compartido por todo el proceso.
+
+    Como máximo hay `size` conexiones abiertas; si están todas en uso, `acquire`
+    espera hasta `timeout` segundos y luego lanza PoolError. Las conexiones que
+    llevan más de `ping_interval` segundos ociosas se comprueban con un ping antes
+    de entregarlas, y las que fallan se descartan. Registra el tiempo de espera de
+    cada préstamo para poder dimensionar el pool (ver `stats`).
+    """
+
+    def __init__(self, connect, size=5, timeout=30.0, ping_interval=30.0):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = collections.deque()  # (conexión, instante de devolución)
+        self._lock = threading.Lock()
+
+        # Métricas
+        self._waits = collections.deque(maxlen=1000)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.in_use = 0
+
+    @contextmanager
+    def connection(self):
+        """Presta una conexión durante el bloque `with` y la devuelve al salir."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def acquire(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolError(f"No hay conexiones libres en el pool tras {self.timeout} s (tamaño {self.size})")
+        waited = time.perf_counter() - start
+
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._waits.append(waited)
+            self.checkouts += 1
+            self.in_use += 1
+        return conn
+
+    def release(self, conn):
+        try:
+            # Cierra la transacción implícita para que la siguiente lectura vea datos nuevos
+            conn.rollback()
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        except Exception:
+            self._discard(conn)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                item = self._idle.pop() if self._idle else None
+            if item is None:
+                conn = self._connect()
+                with self._lock:
+                    self.created += 1
+                return conn
+
+            conn, released_at = item
+            if time.monotonic() - released_at < self.ping_interval or self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Devuelve el estado del pool y el tiempo de espera de los últimos préstamos (ms)."""
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'created': self.created,
+                'discarded': self.discarded,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+            }
+        if waits:
+            stats['wait_avg_ms'] = round(1000 * sum(waits) / len(waits), 2)
+            stats['wait_p95_ms'] = round(1000 * waits[int(0.95 * (len(waits) - 1))], 2)
+            stats['wait_max_ms'] = round(1000 * waits[-1], 2)
+        return stats
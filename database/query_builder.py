@@ -0,0 +1,125 @@
+import pandas as pd
+from database.lookups import DESCRIPTION_COLUMNS, UNKNOWN, describe
+
+# Filtros de rango de fechas (columna del dashboard = columna de la tabla)
+DATE_FILTERS = ('arrival_date', 'departure_date')
+
+# Filtros de selección múltiple: columna del dashboard -> (columna de código, lookup o None)
+MULTISELECT_FILTERS = {
+    'operator': ('operator', None),
+    'loading_port_': DESCRIPTION_COLUMNS['loading_port_'],
+    'discharge_port': DESCRIPTION_COLUMNS['discharge_port'],
+    'status_': DESCRIPTION_COLUMNS['status_'],
+    'full_/_empty_': DESCRIPTION_COLUMNS['full_/_empty_'],
+    'port_register_': DESCRIPTION_COLUMNS['port_register_'],
+}
+
+# Texto con el que se muestran los valores nulos en los multiselect
+NULL_LABEL = 'None'
+# Textos con los que `astype(str)` muestra los nulos en el sidebar
+NULL_LABELS = {NULL_LABEL, 'nan', '<NA>'}
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _multiselect_clause(column, selected, lookup, maps):
+    """
+    Traduce las descripciones seleccionadas a una condición sobre los códigos de la tabla,
+    de modo que MySQL pueda usar los índices de `column`.
+    """
+    selected = set(selected)
+    include_null = False
+    parts, params = [], []
+
+    if lookup is None:
+        codes = [value for value in selected if value not in NULL_LABELS]
+        include_null = bool(selected & NULL_LABELS)
+    elif lookup == 'ports':
+        ports_map = maps['ports']
+        codes = [code for code, desc in ports_map.items() if desc in selected]
+        # Los puertos sin descripción se muestran con su propio código: solo las
+        # etiquetas que no son la descripción de ningún puerto se buscan como código
+        descriptions = set(ports_map.values())
+        codes += [value for value in selected if value not in ports_map and value not in descriptions]
+        include_null = '' in selected
+    else:
+        lookup_map = maps[lookup]
+        codes = [code for code, desc in lookup_map.items() if desc in selected]
+        if UNKNOWN in selected:
+            include_null = True
+            if lookup_map:
+                parts.append(f"{column} NOT IN ({_placeholders(lookup_map)})")
+                params += list(lookup_map)
+
+    if codes:
+        parts.append(f"{column} IN ({_placeholders(codes)})")
+        params += codes
+    if include_null:
+        parts.append(f"{column} IS NULL")
+
+    if not parts:
+        return '1 = 0', []
+    return f"({' OR '.join(parts)})", params
+
+
+def build_where(filter_values, filter_options, maps):
+    """
+    Convierte los `filter_values` del sidebar en una cláusula WHERE parametrizada
+    sobre movimiento_contenedores. Los filtros de selección múltiple que tienen
+    marcadas todas sus opciones (`filter_options`) se omiten.
+    Devuelve (cláusula, parámetros); una cláusula vacía significa sin filtros.
+    """
+    clauses, params = [], []
+    for col, value in filter_values.items():
+        if col in DATE_FILTERS:
+            start_date, end_date = value
+            clauses.append(f"{col} BETWEEN %s AND %s")
+            params += [start_date, end_date]
+        else:
+            if set(filter_options.get(col, [])) <= set(value):
+                continue
+            source, lookup = MULTISELECT_FILTERS[col]
+            clause, clause_params = _multiselect_clause(source, value, lookup, maps)
+            clauses.append(clause)
+            params += clause_params
+    return ' AND '.join(clauses), params
+
+
+def fetch_filter_options(conn, maps):
+    """
+    Calcula las opciones del sidebar en la base de datos, sin cargar los movimientos:
+    los valores distintos (ya traducidos) de cada filtro de selección múltiple y el
+    rango (mín, máx) de cada filtro de fecha, o None si no hay fechas válidas.
+    Las etiquetas son las mismas que en modo memoria (utils.filters.FilterIndex):
+    el texto de cada valor y NULL_LABEL para los nulos.
+    """
+    options = {}
+    for col, (source, lookup) in MULTISELECT_FILTERS.items():
+        values = pd.read_sql(f"SELECT DISTINCT {source} FROM movimiento_contenedores", conn)[source]
+        if lookup is not None:
+            values = describe(values, lookup, maps)
+        options[col] = sorted({NULL_LABEL if pd.isna(value) else str(value) for value in values})
+
+    bounds = pd.read_sql(
+        "SELECT " + ', '.join(f"MIN({col}) AS min_{col}, MAX({col}) AS max_{col}" for col in DATE_FILTERS)
+        + " FROM movimiento_contenedores",
+        conn,
+    ).iloc[0]
+    for col in DATE_FILTERS:
+        min_date = pd.to_datetime(bounds[f'min_{col}'], errors='coerce')
+        max_date = pd.to_datetime(bounds[f'max_{col}'], errors='coerce')
+        options[col] = None if pd.isna(min_date) or pd.isna(max_date) else (min_date.date(), max_date.date())
+    return options
+
+
+def table_version(conn):
+    """
+    (filas, id máximo) de movimiento_contenedores: cambia con cada alta o baja y sirve
+    de clave para cachear lo que se calcula sobre la tabla completa.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*), MAX(id) FROM movimiento_contenedores")
+        return tuple(cursor.fetchone())
+
@@ -0,0 +1,69 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplica llamadas concurrentes con la misma clave: la primera ejecuta la
+    función y las que llegan mientras está en curso esperan y reciben su mismo
+    resultado (o su misma excepción), en lugar de repetir la consulta.
+    No guarda nada: una vez termina la llamada, la siguiente vuelve a ejecutarse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, func):
+        """
+        Ejecuta `func()` una sola vez por cada grupo de llamadas concurrentes con
+        `key`. Devuelve (resultado, compartido): `compartido` es True si el resultado
+        viene de la llamada de otro hilo y es el mismo objeto que recibió ese hilo.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def wait(self, key, timeout=None):
+        """Espera hasta `timeout` segundos a que termine la llamada en curso con `key`; devuelve True si terminó."""
+        with self._lock:
+            call = self._calls.get(key)
+        return call is None or call.done.wait(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'calls': self.calls, 'shared': self.shared}
@@ -0,0 +1,39 @@
+import json
+import os
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Clave de los metadatos propios dentro del esquema Arrow
+METADATA_KEY = b'container_dashboard'
+
+
+def save_snapshot(df, path, meta):
+    """
+    Guarda `df` en `path` como Arrow IPC (Feather v2, lz4) con `meta` (dict serializable
+    a JSON) en los metadatos del esquema. Escribe a un temporal y lo renombra, para que
+    un lector nunca vea un archivo a medias.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[METADATA_KEY] = json.dumps(meta).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    feather.write_feather(table, tmp_path, compression='lz4')
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path):
+    """
+    Lee un snapshot escrito por `save_snapshot`. Devuelve (df, meta), o None si el
+    archivo no existe o no es un snapshot válido.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+        meta = json.loads(table.schema.metadata[METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+    return table.to_pandas(), meta
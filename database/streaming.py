@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+
+def read_chunks(conn, query, params=(), chunk_size=100_000):
+    """
+    Ejecuta `query` con un cursor sin buffer (el servidor envía las filas a medida
+    que se leen) y devuelve DataFrames de hasta `chunk_size` filas. Si no hay
+    filas devuelve un único DataFrame vacío con las columnas de la consulta.
+    """
+    with conn.cursor(buffered=False) as cursor:
+        cursor.execute(query, tuple(params))
+        columns = list(cursor.column_names)
+        empty = True
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            empty = False
+            # coerce_float: los DECIMAL llegan como float, igual que con pd.read_sql
+            yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        if empty:
+            yield pd.DataFrame(columns=columns)
+
+
+class ColumnBuffers:
+    """
+    Buffers columnares preasignados para `rows` filas, que se rellenan bloque a bloque.
+
+    El tipo de cada buffer se decide con el primer bloque ya preparado: datetime64[ns]
+    y timedelta64[ns] para fechas y horas, el mismo tipo numérico del bloque para las
+    columnas numéricas, códigos int32 más un diccionario de valores para las
+    `category_columns` y object solo para el resto (textos). Así el pico de memoria es
+    el frame final más un bloque, y las columnas de baja cardinalidad nunca existen
+    como arrays object completos.
+
+    Las columnas enteras (y booleanas) llevan además una máscara de nulos, porque un
+    bloque posterior puede traer NULL: si aparece alguno, la columna final es float64
+    con NaN (object con None las booleanas), los mismos tipos que da pd.read_sql.
+    """
+
+    def __init__(self, rows, sample, category_columns=()):
+        self.rows = 0
+        self.columns = list(sample.columns)
+        self.kinds, self.arrays, self.categories, self.masks = {}, {}, {}, {}
+        # Bytes que ocuparían las columnas category como object (para el informe de memoria)
+        self.object_bytes = {}
+        for col in self.columns:
+            if col in category_columns:
+                kind, dtype = 'category', np.int32
+                self.categories[col] = {}
+                self.object_bytes[col] = 0
+            elif sample[col].dtype.kind == 'M':
+                kind, dtype = 'values', 'datetime64[ns]'
+            elif sample[col].dtype.kind == 'm':
+                kind, dtype = 'values', 'timedelta64[ns]'
+            elif sample[col].dtype.kind in 'iub' or col == 'id':
+                kind = 'nullable'
+                dtype = sample[col].dtype if sample[col].dtype.kind in 'iub' else np.int64
+                self.masks[col] = np.zeros(rows, dtype=bool)
+            elif sample[col].dtype.kind == 'f':
+                kind, dtype = 'values', sample[col].dtype
+            else:
+                kind, dtype = 'values', object
+            self.kinds[col] = kind
+            self.arrays[col] = np.empty(rows, dtype=dtype)
+
+    def append(self, chunk):
+        start, end = self.rows, self.rows + len(chunk)
+        self._ensure_capacity(end)
+        for col in self.columns:
+            target = self.arrays[col]
+            if self.kinds[col] == 'category':
+                self.object_bytes[col] += chunk[col].memory_usage(deep=True, index=False)
+                target[start:end] = self._encode(col, chunk[col])
+            elif self.kinds[col] == 'nullable':
+                self._fill_nullable(col, chunk[col], start, end)
+            else:
+                target[start:end] = chunk[col].to_numpy(dtype=target.dtype)
+        self.rows = end
+
+    def _fill_nullable(self, col, series, start, end):
+        target = self.arrays[col]
+        missing = series.isna().to_numpy()
+        if not missing.any():
+            target[start:end] = series.to_numpy(dtype=target.dtype)
+            return
+        self.masks[col][start:end] = missing
+        target[start:end][~missing] = series[~missing].to_numpy(dtype=target.dtype)
+
+    def _encode(self, col, series):
+        # Códigos del bloque -> códigos globales; los nulos (-1) se mantienen
+        categories = self.categories[col]
+        codes, uniques = pd.factorize(series)
+        mapping = np.array([categories.setdefault(value, len(categories)) for value in uniques] + [-1], dtype=np.int32)
+        return mapping[codes]
+
+    def _ensure_capacity(self, rows):
+        # Solo ocurre si llegan más filas que las contadas al preasignar
+        capacity = len(next(iter(self.arrays.values()))) if self.arrays else 0
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, 2 * capacity)
+        for col, array in self.arrays.items():
+            grown = np.empty(new_capacity, dtype=array.dtype)
+            grown[:self.rows] = array[:self.rows]
+            self.arrays[col] = grown
+        for col, mask in self.masks.items():
+            grown = np.zeros(new_capacity, dtype=bool)
+            grown[:self.rows] = mask[:self.rows]
+            self.masks[col] = grown
+
+    def to_frame(self):
+        """Devuelve el DataFrame con las filas recibidas, sin copiar los buffers."""
+        data = {}
+        for col in self.columns:
+            values = self.arrays[col][:self.rows]
+            if self.kinds[col] == 'category':
+                values = pd.Categorical.from_codes(values, categories=pd.Index(list(self.categories[col]), dtype=object))
+            elif self.kinds[col] == 'nullable' and self.masks[col][:self.rows].any():
+                values = self._with_nulls(values, self.masks[col][:self.rows])
+            data[col] = values
+        return pd.DataFrame(data, copy=False)
+
+    @staticmethod
+    def _with_nulls(values, missing):
+        # Mismo resultado que pd.read_sql con NULL: float64 con NaN (object con None si es booleana)
+        if values.dtype.kind == 'b':
+            values = values.astype(object)
+            values[missing] = None
+        else:
+            values = values.astype(np.float64)
+            values[missing] = np.nan
+        return values
+
+    def memory_sizes(self):
+        """{columna category: (bytes como object, bytes como category)} para utils.memory.memory_report."""
+        df = self.to_frame()
+        return {
+            col: (self.object_bytes[col], df[col].memory_usage(deep=True, index=False))
+            for col in self.categories
+        }
@@ -0,0 +1,51 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+import plotly.express as px
+
+# Número máximo de figuras guardadas (LRU), compartidas por todas las sesiones
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", "64"))
+
+_CHARTS = {'bar': px.bar, 'pie': px.pie, 'line': px.line}
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def frame_hash(df):
+    """Hash del contenido de `df` (valores y nombres de columna, sin el índice)."""
+    digest = hashlib.sha1(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def cached_figure(kind, df, **kwargs):
+    """
+    Devuelve la figura de Plotly Express `kind` ('bar', 'pie' o 'line') para `df`,
+    reutilizando la ya construida si el contenido del frame y los argumentos son
+    los mismos: un rerun con los mismos agregados no vuelve a pasar por Plotly Express.
+    La figura es compartida y no debe modificarse.
+    """
+    key = (kind, frame_hash(df), repr(sorted(kwargs.items())))
+    with _lock:
+        fig = _figures.get(key)
+        if fig is not None:
+            _figures.move_to_end(key)
+            _stats['hits'] += 1
+            return fig
+        _stats['misses'] += 1
+
+    fig = _CHARTS[kind](df, **kwargs)
+    with _lock:
+        _figures[key] = fig
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+    return fig
+
+
+def figure_cache_stats():
+    with _lock:
+        return {'entries': len(_figures), 'max_entries': FIGURE_CACHE_SIZE, **_stats}
@@ -0,0 +1,304 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from database.query_builder import DATE_FILTERS, MULTISELECT_FILTERS, NULL_LABEL
+
+# Máximo de valores distintos para los que una columna guarda un bitmap por valor
+BITMAP_MAX_VALUES = int(os.getenv("BITMAP_MAX_VALUES", "64"))
+
+
+def _factorize_labels(series):
+    """
+    Devuelve (códigos, etiquetas): las etiquetas son el texto de cada valor distinto,
+    ordenadas, y `códigos` indica la etiqueta de cada fila con el entero más pequeño posible.
+    """
+    codes, uniques = pd.factorize(series)
+    raw_labels = [str(value) for value in uniques]
+    has_nulls = bool((codes == -1).any())
+    if has_nulls:
+        # Los nulos se factorizan como -1, que apunta a esta última etiqueta
+        raw_labels.append(NULL_LABEL)
+    # Valores distintos con el mismo texto (p. ej. 1 y '1') comparten etiqueta
+    labels, remap = np.unique(np.array(raw_labels, dtype=object), return_inverse=True)
+    remap = remap.astype(np.min_scalar_type(max(len(labels) - 1, 0)))
+    return remap[codes] if len(remap) else np.zeros(len(series), dtype=np.uint8), labels
+
+
+def _codes_dtype(labels):
+    return np.min_scalar_type(max(len(labels) - 1, 0))
+
+
+def _prepend_bits(new_bits, old_bits, old_rows):
+    """Bitmap empaquetado con las filas `new_bits` (booleanos) delante de las `old_rows` de `old_bits`."""
+    head = np.packbits(new_bits)
+    shift = len(new_bits) % 8
+    if shift == 0:
+        return np.concatenate([head, old_bits])
+    # Los bits existentes se desplazan `shift` posiciones: cada byte se reparte entre dos
+    out = np.zeros(-(-(len(new_bits) + old_rows) // 8), dtype=np.uint8)
+    out[:len(head)] = head
+    out[len(head) - 1:len(head) - 1 + len(old_bits)] |= old_bits >> shift
+    out[len(head):] |= (old_bits << (8 - shift))[:len(out) - len(head)]
+    return out
+
+
+class FilterIndex:
+    """
+    Columnas de filtro precalculadas una vez por cada versión del frame, para que
+    los reruns del dashboard no vuelvan a convertir columnas completas.
+
+    Los filtros de selección múltiple se guardan como códigos enteros sobre sus
+    etiquetas de texto ordenadas (que son también las opciones del sidebar) y los
+    de fecha como una permutación que las ordena más los valores datetime64 ya
+    ordenados, de modo que un rango se resuelve con dos `searchsorted`
+    (O(log n)) en un tramo contiguo de la permutación. Las columnas con hasta
+    BITMAP_MAX_VALUES etiquetas guardan además un bitmap empaquetado (1 bit por
+    fila) por etiqueta: un multiselect es entonces el OR de unos pocos bitmaps sobre
+    n/8 bytes. `facets` combina todos los filtros en una sola máscara.
+
+    Tras una carga incremental, `prepend` extiende el índice con las filas nuevas
+    sin recalcular las existentes, y `save`/`load` lo guardan junto al snapshot
+    para no reconstruirlo en el arranque.
+    """
+
+    def __init__(self, df, multiselect_cols=tuple(MULTISELECT_FILTERS), date_cols=DATE_FILTERS):
+        self.rows = len(df)
+        self.codes, self.labels, self.bitmaps = {}, {}, {}
+        for col in multiselect_cols:
+            codes, labels = _factorize_labels(df[col])
+            self.codes[col], self.labels[col] = codes, labels
+            if len(labels) <= BITMAP_MAX_VALUES:
+                self.bitmaps[col] = [np.packbits(codes == i) for i in range(len(labels))]
+        # Las opciones del sidebar (y sus conteos sin filtros) se calculan una vez por versión de los datos
+        self._options = {col: labels.tolist() for col, labels in self.labels.items()}
+        self.counts = {col: np.bincount(codes, minlength=len(self.labels[col])) for col, codes in self.codes.items()}
+
+        self.date_order, self.date_sorted, self.date_valid = {}, {}, {}
+        order_dtype = np.int32 if self.rows < 2**31 else np.int64
+        for col in date_cols:
+            values = pd.to_datetime(df[col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+            # NumPy ordena NaT al final: las fechas válidas son el prefijo [0, valid)
+            order = np.argsort(values, kind='stable').astype(order_dtype)
+            self.date_order[col] = order
+            self.date_sorted[col] = values[order]
+            self.date_valid[col] = int((~np.isnat(values)).sum())
+
+    def prepend(self, df_new):
+        """
+        Devuelve el índice del frame que resulta de anteponer `df_new` al de este
+        índice (como en las cargas incrementales de MovimientosStore), sin modificar
+        este. El coste es proporcional a las filas nuevas más copias lineales de los
+        arrays existentes: las etiquetas se fusionan y los códigos solo se remapean si
+        aparecen etiquetas nuevas, los bitmaps se desplazan y las fechas nuevas se
+        intercalan en las ya ordenadas, sin volver a ordenar toda la columna.
+        """
+        new_rows = len(df_new)
+        if not new_rows:
+            return self
+        index = FilterIndex.__new__(FilterIndex)
+        index.rows = new_rows + self.rows
+        index.codes, index.labels, index.bitmaps, index.counts = {}, {}, {}, {}
+        for col, old_codes in self.codes.items():
+            new_codes, new_labels = _factorize_labels(df_new[col])
+            old_labels = self.labels[col]
+            labels = np.union1d(old_labels, new_labels).astype(object)
+            old_remap = np.searchsorted(labels, old_labels)
+            new_codes = np.searchsorted(labels, new_labels)[new_codes]
+
+            codes = np.empty(index.rows, dtype=_codes_dtype(labels))
+            codes[:new_rows] = new_codes
+            # Sin etiquetas nuevas los códigos existentes no cambian
+            codes[new_rows:] = old_codes if len(labels) == len(old_labels) else old_remap[old_codes]
+            counts = np.bincount(new_codes, minlength=len(labels))
+            counts[old_remap] += self.counts[col]
+            index.codes[col], index.labels[col], index.counts[col] = codes, labels, counts
+
+            if col in self.bitmaps and len(labels) <= BITMAP_MAX_VALUES:
+                old_bitmaps = [None] * len(labels)
+                for position, bitmap in zip(old_remap, self.bitmaps[col]):
+                    old_bitmaps[position] = bitmap
+                empty = np.zeros(-(-self.rows // 8), dtype=np.uint8)
+                index.bitmaps[col] = [
+                    _prepend_bits(new_codes == i, empty if bitmap is None else bitmap, self.rows)
+                    for i, bitmap in enumerate(old_bitmaps)
+                ]
+        index._options = {col: labels.tolist() for col, labels in index.labels.items()}
+
+        index.date_order, index.date_sorted, index.date_valid = {}, {}, {}
+        order_dtype = np.int32 if index.rows < 2**31 else np.int64
+        for col, old_sorted in self.date_sorted.items():
+            values = pd.to_datetime(df_new[col], errors='coerce').to_numpy(dtype='datetime64[ns]')
+            new_order = np.argsort(values, kind='stable').astype(order_dtype)
+            new_sorted = values[new_order]
+            new_valid = int((~np.isnat(values)).sum())
+            old_valid = self.date_valid[col]
+            # Las filas existentes pasan a estar `new_rows` posiciones más abajo
+            old_order = self.date_order[col].astype(order_dtype) + new_rows
+            # Con fechas iguales las filas nuevas (índices menores) van delante, como en un argsort estable
+            at = np.searchsorted(old_sorted[:old_valid], new_sorted[:new_valid], side='left')
+            index.date_order[col] = np.concatenate([
+                np.insert(old_order[:old_valid], at, new_order[:new_valid]),
+                new_order[new_valid:],
+                old_order[old_valid:],
+            ])
+            index.date_sorted[col] = np.concatenate([
+                np.insert(old_sorted[:old_valid], at, new_sorted[:new_valid]),
+                new_sorted[new_valid:],
+                old_sorted[old_valid:],
+            ])
+            index.date_valid[col] = old_valid + new_valid
+        return index
+
+    def save(self, path, meta):
+        """
+        Guarda el índice en `path` (formato .npz de NumPy, sin pickle) con `meta` (dict
+        serializable a JSON). Escribe a un temporal y lo renombra, como los snapshots.
+        """
+        arrays = {'rows': np.array(self.rows), 'meta': np.array(json.dumps(meta))}
+        for col, codes in self.codes.items():
+            arrays[f'codes/{col}'] = codes
+            arrays[f'labels/{col}'] = np.array(self.labels[col].tolist(), dtype=str)
+            arrays[f'counts/{col}'] = self.counts[col]
+            if col in self.bitmaps:
+                bitmaps = self.bitmaps[col]
+                arrays[f'bitmaps/{col}'] = np.stack(bitmaps) if bitmaps else np.zeros((0, 0), dtype=np.uint8)
+        for col, order in self.date_order.items():
+            arrays[f'date_order/{col}'] = order
+            arrays[f'date_sorted/{col}'] = self.date_sorted[col]
+            arrays[f'date_valid/{col}'] = np.array(self.date_valid[col])
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Lee un índice escrito por `save`. Devuelve (índice, meta), o None si no existe o no es válido."""
+        if not os.path.exists(path):
+            return None
+        index = cls.__new__(cls)
+        index.codes, index.labels, index.bitmaps, index.counts = {}, {}, {}, {}
+        index.date_order, index.date_sorted, index.date_valid = {}, {}, {}
+        targets = {
+            'codes': index.codes, 'labels': index.labels, 'counts': index.counts, 'bitmaps': index.bitmaps,
+            'date_order': index.date_order, 'date_sorted': index.date_sorted, 'date_valid': index.date_valid,
+        }
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                index.rows = int(arrays['rows'])
+                meta = json.loads(str(arrays['meta']))
+                for name in arrays.files:
+                    kind, _, col = name.partition('/')
+                    if kind in targets:
+                        targets[kind][col] = arrays[name]
+        except (OSError, KeyError, ValueError):
+            return None
+        index.labels = {col: labels.astype(object) for col, labels in index.labels.items()}
+        index.bitmaps = {col: list(bitmaps) for col, bitmaps in index.bitmaps.items()}
+        index.date_valid = {col: int(valid) for col, valid in index.date_valid.items()}
+        index._options = {col: labels.tolist() for col, labels in index.labels.items()}
+        return index, meta
+
+    def options(self, col):
+        """
+        Opciones del filtro: etiquetas ordenadas, o (mín, máx) / None en las fechas.
+        La lista es compartida por todas las sesiones y no debe modificarse.
+        """
+        if col in self.date_sorted:
+            return self.date_bounds(col)
+        return self._options[col]
+
+    def date_bounds(self, col):
+        """(fecha mínima, fecha máxima) de la columna, o None si no tiene fechas válidas."""
+        valid = self.date_valid[col]
+        if not valid:
+            return None
+        values = self.date_sorted[col]
+        return pd.Timestamp(values[0]).date(), pd.Timestamp(values[valid - 1]).date()
+
+    def facets(self, filter_values):
+        """
+        Aplica los filtros y cuenta, para cada filtro de selección múltiple, cuántas
+        filas seleccionaría cada etiqueta con todos los *demás* filtros aplicados.
+
+        Se calcula una sola vez cuántos filtros incumple cada fila: las filas que no
+        incumplen ninguno cuentan en todas las columnas y las que incumplen uno solo
+        cuentan únicamente en la columna de ese filtro. Cada columna se resuelve así
+        con un `np.bincount` sobre sus códigos, sin volver a combinar los demás filtros.
+        Se omiten los multiselect con todas sus opciones marcadas y los rangos de fecha
+        que cubren todo el rango de una columna sin nulos. Devuelve (máscara booleana,
+        o None si no hay que filtrar, {columna: conteos por etiqueta}).
+        """
+        masks = {}
+        for col, value in filter_values.items():
+            if col in self.date_sorted:
+                col_mask = self._date_mask(col, *value)
+            else:
+                col_mask = self._multiselect_mask(col, value)
+            if col_mask is not None:
+                masks[col] = col_mask
+        if not masks:
+            return None, self.counts
+
+        fails = np.zeros(self.rows, dtype=np.uint8)
+        for col_mask in masks.values():
+            fails += ~col_mask
+        passed = fails == 0
+        failed_once = fails == 1
+        counts = {}
+        for col, codes in self.codes.items():
+            rows = passed | (failed_once & ~masks[col]) if col in masks else passed
+            counts[col] = np.bincount(codes[rows], minlength=len(self.labels[col]))
+        return passed, counts
+
+    def _multiselect_mask(self, col, selected):
+        selected_labels = np.isin(self.labels[col], list(selected))
+        if selected_labels.all():
+            return None
+        bitmaps = self.bitmaps.get(col)
+        if bitmaps is None:
+            # Sin bitmaps: una búsqueda por fila en la tabla de etiquetas seleccionadas
+            return selected_labels[self.codes[col]]
+        if not selected_labels.any():
+            return np.zeros(self.rows, dtype=bool)
+
+        # Se combinan los bitmaps del lado más corto: las etiquetas marcadas,
+        # o las no marcadas y se invierte el resultado
+        invert = selected_labels.sum() > len(selected_labels) / 2
+        positions = np.flatnonzero(~selected_labels if invert else selected_labels)
+        bits = bitmaps[positions[0]].copy()
+        for position in positions[1:]:
+            bits |= bitmaps[position]
+        if invert:
+            np.invert(bits, out=bits)
+        return np.unpackbits(bits, count=self.rows).view(bool)
+
+    def memory_usage(self):
+        """Bytes ocupados por el índice (códigos, bitmaps y fechas)."""
+        return (
+            sum(codes.nbytes for codes in self.codes.values())
+            + sum(bitmap.nbytes for bitmaps in self.bitmaps.values() for bitmap in bitmaps)
+            + sum(order.nbytes for order in self.date_order.values())
+            + sum(values.nbytes for values in self.date_sorted.values())
+        )
+
+    def _date_mask(self, col, start_date, end_date):
+        values, order = self.date_sorted[col], self.date_order[col]
+        start = np.searchsorted(values, np.datetime64(start_date, 'ns'), side='left')
+        end = np.searchsorted(values, np.datetime64(end_date, 'ns'), side='right')
+        end = max(min(end, self.date_valid[col]), start)
+        if start == 0 and end == self.rows:
+            return None
+
+        # Se marcan las filas del tramo [start, end) o se desmarcan las de fuera, lo que sea menor
+        if end - start <= self.rows // 2:
+            mask = np.zeros(self.rows, dtype=bool)
+            mask[order[start:end]] = True
+        else:
+            mask = np.ones(self.rows, dtype=bool)
+            mask[order[:start]] = False
+            mask[order[end:]] = False
+        return mask
@@ -0,0 +1,58 @@
+import pandas as pd
+
+# Columnas de baja cardinalidad que se guardan como `category` en modo compacto
+COMPACT_COLUMNS = [
+    'operator', 'status_', 'full_/_empty_', 'loading_port_', 'discharge_port', 'delivery_port',
+    'port_register_', 'eqd_-_qual', 'size', 'type', 'dock',
+]
+
+
+def is_categorical(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def compact_frame(df, columns=COMPACT_COLUMNS):
+    """
+    Convierte en sitio las `columns` de `df` a dtype `category`: cada valor distinto
+    se guarda una sola vez y las filas solo llevan un código entero.
+    Devuelve un informe de memoria por columna (ver `memory_report`).
+    """
+    sizes = {}
+    for col in columns:
+        if col not in df or is_categorical(df[col]):
+            continue
+        before = df[col].memory_usage(deep=True, index=False)
+        df[col] = df[col].astype('category')
+        sizes[col] = (before, df[col].memory_usage(deep=True, index=False))
+    return memory_report(sizes)
+
+
+def memory_report(sizes):
+    """
+    Construye un DataFrame con la memoria (MB) antes y después de cada columna
+    a partir de {columna: (bytes_antes, bytes_después)}, con una fila de total.
+    """
+    report = pd.DataFrame.from_dict(sizes, orient='index', columns=['Antes (MB)', 'Después (MB)'], dtype=float)
+    report.loc['Total'] = report.sum()
+    report = report / 2**20
+    report['Reducción (x)'] = report['Antes (MB)'] / report['Después (MB)']
+    return report.round(2)
+
+
+def concat_compact(df_new, df_old):
+    """
+    Antepone `df_new` a `df_old` manteniendo las columnas `category` de `df_old`
+    (pd.concat las convierte a object si las categorías no coinciden).
+    Las categorías nuevas se añaden al final, sin recodificar las filas existentes.
+    `df_old` no se modifica.
+    """
+    df_old = df_old.copy(deep=False)
+    for col in df_old.columns:
+        if not is_categorical(df_old[col]) or col not in df_new:
+            continue
+        categories = df_old[col].cat.categories
+        added = pd.Index(df_new[col].dropna().unique()).difference(categories)
+        if len(added):
+            df_old[col] = df_old[col].cat.add_categories(added)
+        df_new[col] = df_new[col].astype(df_old[col].dtype)
+    return pd.concat([df_new, df_old], ignore_index=True)
@@ -0,0 +1,32 @@
+import numpy as np
+from utils.memory import is_categorical
+
+# Tamaños de página que ofrece la tabla paginada
+PAGE_SIZES = [50, 100, 250, 500, 1000]
+
+
+def page_count(rows, page_size):
+    """Número de páginas (al menos una) para `rows` filas."""
+    return max(1, -(-rows // page_size))
+
+
+def slice_page(df, sort='id', ascending=False, page=1, page_size=100):
+    """
+    Devuelve la página `page` (desde 1) de `df` ordenado por `sort` y después por
+    su orden actual. Solo se ordena la columna `sort` (sin copiar el frame) y se
+    toman las filas de la página, así que el resultado tiene a lo sumo `page_size`
+    filas sea cual sea el tamaño de `df`.
+    """
+    start = (page - 1) * page_size
+    if sort == 'id' and not ascending:
+        # Los frames del dashboard ya están ordenados por id descendente
+        return df.iloc[start:start + page_size]
+
+    values = df[sort]
+    if is_categorical(values):
+        # Las categorías están en orden de aparición: se reordenan alfabéticamente (sin tocar las filas)
+        categories = values.cat.categories
+        order = np.argsort(categories.astype(str).to_numpy(), kind='stable')
+        values = values.cat.reorder_categories(categories[order], ordered=True)
+    index = values.sort_values(ascending=ascending, kind='stable', na_position='last').index
+    return df.loc[index[start:start + page_size]]